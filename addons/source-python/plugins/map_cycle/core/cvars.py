@@ -25,6 +25,28 @@ def ufloat_handler(cvar):
     return value
 
 
+def group_quotas_handler(cvar):
+    """Parse "tag1:count tag2,tag3:count" into ((tags, count), ...)."""
+    quotas = []
+    for entry in cvar.get_string().split():
+        tags, sep, count = entry.rpartition(':')
+        tags = tuple(tag.lower() for tag in tags.split(',') if tag)
+        if not sep or not tags:
+            raise InvalidValue
+
+        try:
+            count = int(count)
+        except ValueError:
+            raise InvalidValue
+
+        if count < 1:
+            raise InvalidValue
+
+        quotas.append((tags, count))
+
+    return tuple(quotas)
+
+
 config_manager = ControlledConfigManager(
     info.name + "/main", cvar_prefix='mc_')
 
@@ -110,6 +132,18 @@ config_manager.controlled_cvar(
     default=0,
     description=config_strings['alphabetic_sort_by_fullname'],
 )
+config_manager.controlled_cvar(
+    ufloat_handler,
+    name="metrics_interval",
+    default=0.0,
+    description=config_strings['metrics_interval'],
+)
+config_manager.controlled_cvar(
+    ufloat_handler,
+    name="tick_budget",
+    default=0.0,
+    description=config_strings['tick_budget'],
+)
 
 config_manager.section("Votes Settings")
 config_manager.controlled_cvar(
@@ -124,6 +158,21 @@ config_manager.controlled_cvar(
     default=5,
     description=config_strings['votemap_max_options'],
 )
+config_manager.controlled_cvar(
+    uint_handler,
+    name="votemap_method",
+    default=1,
+    description=config_strings['votemap_method'],
+    min_value=1,
+    max_value=3,
+)
+config_manager.controlled_cvar(
+    uint_handler,
+    name="votemap_max_choices",
+    default=3,
+    description=config_strings['votemap_max_choices'],
+    min_value=1,
+)
 config_manager.controlled_cvar(
     uint_handler,
     name="vote_duration",
@@ -168,12 +217,54 @@ config_manager.controlled_cvar(
     default=1,
     description=config_strings['votemap_progress_use_hudmsg'],
 )
+config_manager.controlled_cvar(
+    bool_handler,
+    name="votemap_progress_pending_only",
+    default=0,
+    description=config_strings['votemap_progress_pending_only'],
+)
 config_manager.controlled_cvar(
     bool_handler,
     name="alphabetic_sort_enable",
     default=0,
     description=config_strings['alphabetic_sort_enable'],
 )
+config_manager.controlled_cvar(
+    bool_handler,
+    name="weighted_sampling_enable",
+    default=0,
+    description=config_strings['weighted_sampling_enable'],
+)
+config_manager.controlled_cvar(
+    ufloat_handler,
+    name="sampling_rating_factor",
+    default=3.0,
+    description=config_strings['sampling_rating_factor'],
+)
+config_manager.controlled_cvar(
+    ufloat_handler,
+    name="sampling_new_factor",
+    default=2.0,
+    description=config_strings['sampling_new_factor'],
+)
+config_manager.controlled_cvar(
+    ufloat_handler,
+    name="sampling_recent_factor",
+    default=0.0,
+    description=config_strings['sampling_recent_factor'],
+)
+config_manager.controlled_cvar(
+    bool_handler,
+    name="recommendations_enable",
+    default=0,
+    description=config_strings['recommendations_enable'],
+)
+config_manager.controlled_cvar(
+    group_quotas_handler,
+    name="vote_group_quotas",
+    default="",
+    description=config_strings['vote_group_quotas'],
+)
 config_manager.controlled_cvar(
     sound_nullable_handler,
     name="sound_vote_start",
@@ -264,7 +355,7 @@ config_manager.controlled_cvar(
     default=3,
     description=config_strings['likemap_method'],
     min_value=1,
-    max_value=3
+    max_value=4
 )
 config_manager.controlled_cvar(
     bool_handler,
@@ -0,0 +1,258 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+from collections import defaultdict
+from enum import IntEnum
+import os
+from struct import Struct
+from threading import Lock
+from time import time
+from zlib import crc32
+
+# Source.Python
+from listeners.tick import GameThread
+
+# Map Cycle
+from .paths import JOURNAL_PATH
+from .scheduler import scheduler
+from .server_maps import get_wilson_score
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+# Kind, filename (padded with zeros), value, CRC32 of the previous fields
+RECORD = Struct('<B64sdI')
+RECORD_BODY = Struct('<B64sd')
+
+# How long records pile up before they're synced to disk in one batch
+SYNC_DELAY = 1.0
+
+
+# =============================================================================
+# >> CLASSES
+# =============================================================================
+class JournalEntry(IntEnum):
+    """What the value of a journal record is added to.
+
+    Names are the names of the database columns.
+    """
+    LIKES = 1
+    DISLIKES = 2
+    PLAYS = 3
+
+
+class Journal:
+    """Append-only file of map statistics that are not in the database yet.
+
+    Every change is written down as a fixed-size record, so a torn write
+    after a crash only damages the last record. Records are written and
+    fsynced in batches from a thread. Records up to the checkpoint are
+    already applied to the ServerMap instances, and they are dropped once
+    those instances are saved to the database.
+
+    Appending only takes the lock of the pending records, the file has
+    its own lock, so the game thread never waits for the disk.
+    """
+    def __init__(self):
+        self._pending = []
+        self._lock = Lock()
+        self._file = None
+        self._file_lock = Lock()
+        self._writer = None
+
+        # Absolute number of records appended and dropped so far
+        self._appended = 0
+        self._dropped = 0
+        self._checkpoint = 0
+
+    def append(self, entry, filename, value=1):
+        body = RECORD_BODY.pack(
+            entry, filename.lower().encode('utf-8')[:64], value)
+
+        with self._lock:
+            self._pending.append(body + crc32(body).to_bytes(4, 'little'))
+            self._appended += 1
+
+        if 'journal_sync' not in scheduler:
+            scheduler.schedule('journal_sync', SYNC_DELAY, self._sync)
+
+    def checkpoint(self):
+        """Mark all records so far as applied to the ServerMap instances."""
+        with self._lock:
+            self._checkpoint = self._appended
+
+    def get_checkpoint(self):
+        return self._checkpoint
+
+    def drop(self, checkpoint):
+        """Drop records up to the checkpoint, they're in the database now.
+        """
+        with self._file_lock:
+            if self._file is None:
+                return
+
+            self._write_pending()
+
+            number = checkpoint - self._dropped
+            if number <= 0:
+                return
+
+            with open(JOURNAL_PATH, 'rb') as f:
+                f.seek(number * RECORD.size)
+                remainder = f.read()
+
+            self._close()
+
+            tmp_path = JOURNAL_PATH + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(remainder)
+                f.flush()
+                os.fsync(f.fileno())
+
+            os.replace(tmp_path, JOURNAL_PATH)
+
+            self._file = open(JOURNAL_PATH, 'ab')
+            self._dropped = checkpoint
+
+    def discard_unapplied(self):
+        """Drop records after the checkpoint, both pending and written.
+
+        They're only needed if the server crashes. Once the plugin is
+        unloaded, the ratings they stand for are gone along with the
+        session players, and players can rate the map again after the
+        plugin is loaded back.
+        """
+        with self._file_lock:
+            with self._lock:
+                self._pending = []
+                self._appended = self._checkpoint
+
+            if self._file is None:
+                return
+
+            self._file.flush()
+            os.ftruncate(
+                self._file.fileno(),
+                (self._checkpoint - self._dropped) * RECORD.size)
+
+            os.fsync(self._file.fileno())
+
+    def replay(self):
+        """Add records left from the last run to the database, then
+        truncate the journal.
+        """
+        from ..map_cycle import logger
+        from .models import ServerMap as DB_ServerMap
+        from .orm import Session
+
+        if not JOURNAL_PATH.isfile():
+            return
+
+        with open(JOURNAL_PATH, 'rb') as f:
+            data = f.read()
+
+        deltas = defaultdict(lambda: defaultdict(float))
+        for offset in range(0, len(data) - RECORD.size + 1, RECORD.size):
+            entry, filename, value, checksum = RECORD.unpack_from(
+                data, offset)
+
+            body = data[offset:offset + RECORD_BODY.size]
+            try:
+                if checksum != crc32(body):
+                    raise ValueError("Checksum mismatch")
+
+                column = JournalEntry(entry).name.lower()
+            except ValueError:
+                logger.log_warning(
+                    "Journal is damaged at offset {}, the rest of it is "
+                    "ignored", offset)
+
+                break
+
+            filename = filename.rstrip(b'\0').decode('utf-8', 'ignore')
+            deltas[filename][column] += value
+
+        if deltas:
+            detected = int(time())
+
+            session = Session()
+            for filename, columns in deltas.items():
+                db_server_map = session.query(DB_ServerMap).filter_by(
+                    filename=filename).first()
+
+                if db_server_map is None:
+                    db_server_map = DB_ServerMap()
+                    db_server_map.filename = filename
+                    db_server_map.detected = detected
+
+                    session.add(db_server_map)
+
+                for column, value in columns.items():
+                    setattr(db_server_map, column, int(
+                        (getattr(db_server_map, column) or 0) + value))
+
+                db_server_map.wilson_score = get_wilson_score(
+                    db_server_map.likes or 0, db_server_map.dislikes or 0)
+
+            session.commit()
+            session.close()
+
+            logger.log_info("Replayed journal for {} map(s)", len(deltas))
+
+        os.remove(JOURNAL_PATH)
+
+    def start(self):
+        JOURNAL_PATH.parent.makedirs_p()
+
+        with self._file_lock:
+            self._file = open(JOURNAL_PATH, 'ab')
+
+    def stop(self):
+        """Write the remaining records and close the journal."""
+        scheduler.cancel('journal_sync')
+
+        if self._writer is not None and self._writer.is_alive():
+            self._writer.join()
+
+        with self._file_lock:
+            self._write_pending()
+            self._close()
+
+    def _sync(self):
+        # Don't pile up writers if the disk is slow, records appended in
+        # the meantime will be written by this one or the next one
+        if self._writer is not None and self._writer.is_alive():
+            scheduler.schedule('journal_sync', SYNC_DELAY, self._sync)
+            return
+
+        self._writer = GameThread(target=self._write)
+        self._writer.start()
+
+    def _write(self):
+        with self._file_lock:
+            self._write_pending()
+
+    def _write_pending(self):
+        # Must be called with the file lock held
+        if self._file is None:
+            return
+
+        with self._lock:
+            pending, self._pending = self._pending, []
+
+        if not pending:
+            return
+
+        self._file.write(b''.join(pending))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+# The singleton object of the Journal class
+journal = Journal()
@@ -3,6 +3,10 @@
 # =============================================================================
 # Python
 from datetime import datetime
+from itertools import islice
+from math import ceil
+import os
+import re
 from time import time
 
 # Source-Python
@@ -10,32 +14,214 @@ from commands.typed import TypedServerCommand
 from core import echo_console
 from listeners.tick import GameThread
 
-# Site-Package
-from jinja2 import Environment
-from jinja2 import FileSystemLoader
-
 # Map Cycle
-from .models import ServerMap as DB_ServerMap
-from .orm import Session
+from .message_dispatcher import message_dispatcher
 from .paths import (
     DBDUMP_DIR, DBDUMP_HTML_PATH, DBDUMP_TXT_PATH, MAPCYCLE_TXT_PATH1,
-    MAPS_DIR, TEMPLATES_DIR, WORKSHOP_DIR)
+    MAPS_DIR, TEMPLATES_CACHE_DIR, TEMPLATES_DIR, TRACE_PATH, WORKSHOP_DIR)
+from .profiler import profiler
+from .render_cache import render_cache
+from .scheduler import scheduler
+from .strings import reload_strings
+from .tracer import tracer
+from .watchdog import watchdog
 
 
 # =============================================================================
 # >> GLOBAL VARIABLES
 # =============================================================================
 DB_SHOW_CAP = 40
+DB_TOP_CAP = 100
+
+# Rows are fetched from the database in batches of this size while dumping
+DBDUMP_BATCH_SIZE = 1000
+
+DBDUMP_HTML_PAGE_SIZE = 1000
+DBDUMP_ORDER_COLUMNS = (
+    'id', 'filename', 'detected', 'likes', 'dislikes', 'wilson_score',
+    'man_hours', 'av_session_len', 'plays')
 
-j2env = Environment(loader=FileSystemLoader(TEMPLATES_DIR))
-j2env.filters['strftime'] = (
-    lambda timestamp: datetime.fromtimestamp(timestamp).strftime('%c'))
-j2template_html = j2env.get_template('databasedump.html')
-j2template_txt = j2env.get_template('databasedump.txt')
+# Pages after the first one go to databasedump_<page>.html
+DBDUMP_HTML_PAGE_PATTERN = re.compile(r"^databasedump_(\d+)\.html$")
+
+# Jinja2 environment, only created when the first dump is requested
+j2env = None
 
 DBDUMP_DIR.makedirs_p()
 
 
+# =============================================================================
+# >> FUNCTIONS
+# =============================================================================
+def get_template(name):
+    global j2env
+    if j2env is None:
+        from jinja2 import (
+            Environment, FileSystemBytecodeCache, FileSystemLoader)
+
+        # Compiled templates survive plugin reloads
+        TEMPLATES_CACHE_DIR.makedirs_p()
+
+        j2env = Environment(
+            loader=FileSystemLoader(TEMPLATES_DIR),
+            bytecode_cache=FileSystemBytecodeCache(TEMPLATES_CACHE_DIR))
+
+        j2env.filters['strftime'] = (
+            lambda timestamp: datetime.fromtimestamp(timestamp).strftime(
+                '%c'))
+
+    return j2env.get_template(name)
+
+
+def get_html_page_path(page):
+    if page == 1:
+        return DBDUMP_HTML_PATH
+
+    return DBDUMP_DIR / "databasedump_{}.html".format(page)
+
+
+def render_to_file(template, path, **context):
+    """Stream the rendered template to a temporary file, then replace
+    the target file with it."""
+    tmp_path = path + ".tmp"
+    template.stream(**context).dump(tmp_path, encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def dump_txt():
+    from .models import ServerMap as DB_ServerMap
+    from .orm import Session
+
+    session = Session()
+    try:
+        rows = session.query(DB_ServerMap).order_by(
+            DB_ServerMap.id).yield_per(DBDUMP_BATCH_SIZE)
+
+        render_to_file(get_template('databasedump.txt'), DBDUMP_TXT_PATH,
+                       rows=rows, dumpdate=time())
+    finally:
+        session.close()
+
+    echo_console("Dump written to {}".format(DBDUMP_TXT_PATH))
+
+
+def dump_html(order_by, page_size):
+    from .models import ServerMap as DB_ServerMap
+    from .orm import Session
+
+    column = getattr(DB_ServerMap, order_by.lstrip('-'))
+    if order_by.startswith('-'):
+        column = column.desc()
+
+    session = Session()
+    try:
+        total = session.query(DB_ServerMap).count()
+        pages = max(1, ceil(total / page_size))
+        page_names = [
+            get_html_page_path(page).name for page in range(1, pages + 1)]
+
+        # One query for all pages, every page takes the next slice of it
+        rows = iter(session.query(DB_ServerMap).order_by(
+            column, DB_ServerMap.id).yield_per(DBDUMP_BATCH_SIZE))
+
+        template = get_template('databasedump.html')
+        dumpdate = time()
+        for page in range(1, pages + 1):
+            render_to_file(
+                template, get_html_page_path(page),
+                rows=islice(rows, page_size), dumpdate=dumpdate,
+                order_by=order_by, total=total, page=page,
+                page_names=page_names)
+    finally:
+        session.close()
+
+    # Remove pages left from previous (bigger) dumps
+    for path in DBDUMP_DIR.files("databasedump_*.html"):
+        match = DBDUMP_HTML_PAGE_PATTERN.match(path.name)
+        if match and int(match.group(1)) > pages:
+            path.remove_p()
+
+    echo_console("Dump written to {} ({} rows, {} page(s))".format(
+        DBDUMP_HTML_PATH, total, pages))
+
+
+def get_stat_columns():
+    """Return SQL expressions that 'mc db top' can sort maps by."""
+    from sqlalchemy import Float, cast, func
+    from .models import ServerMap as DB_ServerMap
+
+    # NULL for the maps that nobody has rated yet
+    rating = cast(DB_ServerMap.likes, Float) / func.nullif(
+        DB_ServerMap.likes + DB_ServerMap.dislikes, 0)
+
+    return {
+        'rating': rating,
+        'likes': DB_ServerMap.likes,
+        'wilson': DB_ServerMap.wilson_score,
+        'man_hours': DB_ServerMap.man_hours,
+        'session_len': DB_ServerMap.av_session_len,
+        'plays': DB_ServerMap.plays,
+    }
+
+
+@watchdog.deferrable
+def dump_trace(events):
+    tracer.dump(events, TRACE_PATH)
+    echo_console("{} trace events written to {}".format(
+        len(events), TRACE_PATH))
+
+
+@watchdog.deferrable
+def scan_maps_folder(prefixes):
+    if prefixes:
+        prefixes = list(map(lambda prefix: prefix.lower(), prefixes))
+        echo_console("Scanning maps only with the "
+                     "following prefixes:\n{}".format(','.join(prefixes)))
+
+        def is_valid_map(path):
+            if path.ext.lower() != ".bsp":
+                return False
+
+            map_name = path.namebase.lower()
+            for prefix in prefixes:
+                if map_name.startswith(prefix):
+                    return True
+
+            return False
+
+    else:
+        echo_console("Scanning all maps...")
+
+        def is_valid_map(path):
+            return path.ext.lower() == ".bsp"
+
+    rs = []
+
+    for map_path in MAPS_DIR.files():
+        if is_valid_map(map_path):
+            rs.append(map_path.namebase.lower())
+
+    if WORKSHOP_DIR.isdir():
+        echo_console(
+            "Found /maps/workshop dir! Scanning Steam Workshop maps...")
+
+        for subdir_path in WORKSHOP_DIR.dirs():
+            subdir_name = subdir_path.namebase.lower()
+
+            for map_path in subdir_path.files():
+                map_name = map_path.namebase.lower()
+
+                if is_valid_map(map_path):
+                    rs.append(f"workshop/{subdir_name}/{map_name}")
+
+    with open(MAPCYCLE_TXT_PATH1, 'w') as f:
+        for map_name in rs:
+            f.write(map_name + '\n')
+
+    echo_console("{} maps were scanned and written to "
+                 "mapcycle.txt".format(len(rs)))
+
+
 # =============================================================================
 # >> COMMANDS
 # =============================================================================
@@ -51,13 +237,61 @@ Reloads mapcycle.json
 > mc rebuild_mapcycle
 Creates new mapcycle.json based on mapcycle.txt (mapcycle_default.txt)
 
+> mc reload_translations
+Reloads translation files and drops all pre-rendered messages
+
+> mc perf enable
+Starts timing Map Cycle hot paths (level init, map list reloads, database
+access, votes, chat messages)
+
+> mc perf disable
+Stops timing, collected timings are kept
+
+> mc perf show
+Prints number of calls, p50, p95 and max duration of every timed section
+
+> mc perf reset
+Drops all collected timings
+
+> mc timers show
+Lists all scheduled timers and the time left until they run
+
+> mc timers pause <timer name>
+> mc timers resume <timer name>
+Pauses or resumes the given timer, e.g. 'change_level' to freeze the time
+that's left on the current map
+
+> mc trace dump
+Writes the latest log events (including debug ones, regardless of the logging
+level) as JSON lines to:
+<mod folder>/logs/source-python/map_cycle/trace.jsonl
+
+> mc trace clear
+Drops all recorded trace events
+
 > mc db show [<starting ID>]
 Prints contents of database.sqlite3. If the starting ID is given, shows the
 contents only beginning from this ID.
 
-> mc db dump_html
-Dumps contents of the database to an HTML page:
+> mc db top [<order by> [<number of maps>]]
+Prints the maps with the highest values of the given statistic (rating,
+likes, wilson, man_hours, session_len, plays), sorted by the database
+itself. 'wilson' is the rating used by mc_likemap_method 4.
+Example:
+mc db top plays 20
+
+> mc db stats
+Prints totals over all maps in the database
+
+> mc db dump_html [<order by> [<rows per page>]]
+Dumps contents of the database to HTML pages:
 <mod folder>/logs/source-python/map_cycle/databasedump.html
+<mod folder>/logs/source-python/map_cycle/databasedump_<page>.html
+Rows are sorted by the given column (id, filename, detected, likes, dislikes,
+wilson_score, man_hours, av_session_len, plays), prefix it with '-' to sort in
+descending order.
+Example:
+mc db dump_html -likes 500
 
 > mc db dump_txt
 Dumps contents of the database to a text file:
@@ -129,8 +363,99 @@ def callback(command_info):
         echo_console("mapcycle.json was rebuild")
 
 
+@TypedServerCommand(['mc', 'reload_translations'])
+def callback(command_info):
+    reload_strings()
+
+    render_cache.clear()
+    message_dispatcher.clear_cache()
+
+    echo_console("Translation files were reloaded")
+
+
+@TypedServerCommand(['mc', 'perf', 'enable'])
+def callback(command_info):
+    profiler.enabled = True
+    echo_console("Profiling enabled")
+
+
+@TypedServerCommand(['mc', 'perf', 'disable'])
+def callback(command_info):
+    profiler.enabled = False
+    echo_console("Profiling disabled")
+
+
+@TypedServerCommand(['mc', 'perf', 'show'])
+def callback(command_info):
+    rows = []
+    for section, calls, p50, p95, max_ in profiler.report():
+        rows.append("{:<30} {:>8} {:>10.3f} {:>10.3f} {:>10.3f}".format(
+            section, calls, p50 * 1000, p95 * 1000, max_ * 1000))
+
+    echo_console("""Profiling is {}, durations are in ms:
+{:<30} {:>8} {:>10} {:>10} {:>10}
+{}""".format(
+        "enabled" if profiler.enabled else "disabled",
+        "section", "calls", "p50", "p95", "max",
+        '\n'.join(rows)))
+
+
+@TypedServerCommand(['mc', 'perf', 'reset'])
+def callback(command_info):
+    profiler.reset()
+    echo_console("Profiling counters were reset")
+
+
+@TypedServerCommand(['mc', 'timers', 'show'])
+def callback(command_info):
+    rows = []
+    for name, time_left, interval, paused in scheduler.get_timers():
+        rows.append("{:<30} {:>10.1f} {:>10} {:>8}".format(
+            name, time_left, "-" if interval is None else interval,
+            "yes" if paused else "no"))
+
+    echo_console("""Timers, time is in seconds:
+{:<30} {:>10} {:>10} {:>8}
+{}""".format("timer", "time left", "interval", "paused", '\n'.join(rows)))
+
+
+@TypedServerCommand(['mc', 'timers', 'pause'])
+def callback(command_info, name:str):
+    if name not in scheduler:
+        echo_console("Unknown timer: {}".format(name))
+        return
+
+    scheduler.pause(name)
+    echo_console("Timer '{}' was paused".format(name))
+
+
+@TypedServerCommand(['mc', 'timers', 'resume'])
+def callback(command_info, name:str):
+    if name not in scheduler:
+        echo_console("Unknown timer: {}".format(name))
+        return
+
+    scheduler.resume(name)
+    echo_console("Timer '{}' was resumed".format(name))
+
+
+@TypedServerCommand(['mc', 'trace', 'dump'])
+def callback(command_info):
+    # Take the snapshot right away, the buffer keeps changing
+    dump_trace(list(tracer.events))
+
+
+@TypedServerCommand(['mc', 'trace', 'clear'])
+def callback(command_info):
+    tracer.clear()
+    echo_console("Trace events were dropped")
+
+
 @TypedServerCommand(['mc', 'db', 'show'])
 def callback(command_info, start_id:int=0):
+    from .models import ServerMap as DB_ServerMap
+    from .orm import Session
+
     session = Session()
 
     echo_console("+----+--------------------------------+--------------+-"
@@ -140,24 +465,17 @@ def callback(command_info, start_id:int=0):
     echo_console("+----+--------------------------------+--------------+-"
                  "------------------+")
 
-    db_server_maps = session.query(DB_ServerMap).order_by(
-        DB_ServerMap.detected)[start_id:start_id+DB_SHOW_CAP]
+    rows = session.query(
+        DB_ServerMap.id, DB_ServerMap.filename, DB_ServerMap.detected,
+        get_stat_columns()['rating'],
+    ).order_by(DB_ServerMap.detected).offset(start_id).limit(DB_SHOW_CAP)
 
-    for db_server_map in db_server_maps:
+    for id_, filename, detected, rating in rows:
         echo_console("| {}| {}| {}| {}|".format(
-            str(db_server_map.id).ljust(3)[:3],
-
-            db_server_map.filename.ljust(31)[:31],
-
-            datetime.fromtimestamp(db_server_map.detected)
-                .strftime('%x').ljust(13)[:13],
-
-            "{:.2f}".format(
-                db_server_map.likes /
-                (db_server_map.likes + db_server_map.dislikes)
-            ).ljust(18)[:18] if (
-                db_server_map.likes + db_server_map.dislikes != 0
-            ) else "n/a".ljust(18),
+            str(id_).ljust(3)[:3],
+            filename.ljust(31)[:31],
+            datetime.fromtimestamp(detected).strftime('%x').ljust(13)[:13],
+            ("n/a" if rating is None else "{:.2f}".format(rating)).ljust(18),
         ))
 
     echo_console("+----+--------------------------------+--------------+-"
@@ -169,27 +487,98 @@ def callback(command_info, start_id:int=0):
     session.close()
 
 
-@TypedServerCommand(['mc', 'db', 'dump_html'])
-def callback(command_info):
+@TypedServerCommand(['mc', 'db', 'top'])
+def callback(command_info, order_by:str='rating', limit:int=10):
+    from .models import ServerMap as DB_ServerMap
+    from .orm import Session
+
+    stat_columns = get_stat_columns()
+    if order_by not in stat_columns:
+        echo_console("Error: Can't sort by '{}', choose one of: {}".format(
+            order_by, ', '.join(stat_columns)))
+
+        return
+
+    column = stat_columns[order_by]
+    limit = max(1, min(limit, DB_TOP_CAP))
+
     session = Session()
 
-    j2template_html.stream(rows=session.query(DB_ServerMap).all(),
-                           dumpdate=time()).dump(DBDUMP_HTML_PATH)
+    rows = session.query(DB_ServerMap.filename, column).filter(
+        column.isnot(None)
+    ).order_by(column.desc(), DB_ServerMap.filename).limit(limit)
+
+    echo_console("+-----+--------------------------------+--------------+")
+    echo_console("| #   | Map File Name (w/o .bsp)       | {}|".format(
+        order_by.ljust(13)))
+    echo_console("+-----+--------------------------------+--------------+")
+
+    for place, (filename, value) in enumerate(rows, 1):
+        echo_console("| {}| {}| {}|".format(
+            str(place).ljust(4),
+            filename.ljust(31)[:31],
+            ("{:.2f}".format(value) if isinstance(value, float)
+             else str(value)).ljust(13)[:13],
+        ))
+
+    echo_console("+-----+--------------------------------+--------------+")
 
-    echo_console("Dump written to {}".format(DBDUMP_HTML_PATH))
     session.close()
 
 
-@TypedServerCommand(['mc', 'db', 'dump_txt'])
+@TypedServerCommand(['mc', 'db', 'stats'])
 def callback(command_info):
+    from sqlalchemy import func
+    from .models import ServerMap as DB_ServerMap
+    from .orm import Session
+
     session = Session()
 
-    j2template_txt.stream(rows=session.query(DB_ServerMap).all(),
-                          dumpdate=time()).dump(DBDUMP_TXT_PATH)
+    (maps, new_maps, likes, dislikes, man_hours, av_session_len,
+     plays) = session.query(
+        func.count(DB_ServerMap.id),
+        func.count(func.nullif(DB_ServerMap.detected, 0)),
+        func.sum(DB_ServerMap.likes),
+        func.sum(DB_ServerMap.dislikes),
+        func.sum(DB_ServerMap.man_hours),
+        func.avg(DB_ServerMap.av_session_len),
+        func.sum(DB_ServerMap.plays),
+    ).one()
 
-    echo_console("Dump written to {}".format(DBDUMP_TXT_PATH))
     session.close()
 
+    echo_console("Maps in the database: {} ({} not marked as old)".format(
+        maps, new_maps))
+
+    echo_console("Likes: {}, dislikes: {}".format(likes or 0, dislikes or 0))
+    echo_console("Man-hours: {:.2f}".format(man_hours or 0.0))
+    echo_console("Average session length: {:.2f}".format(
+        av_session_len or 0.0))
+
+    echo_console("Maps played: {}".format(plays or 0))
+
+
+@TypedServerCommand(['mc', 'db', 'dump_html'])
+def callback(command_info, order_by:str='id',
+             page_size:int=DBDUMP_HTML_PAGE_SIZE):
+
+    if order_by.lstrip('-') not in DBDUMP_ORDER_COLUMNS:
+        echo_console("Error: Can't sort by '{}', choose one of: {}".format(
+            order_by, ', '.join(DBDUMP_ORDER_COLUMNS)))
+
+        return
+
+    if page_size < 1:
+        echo_console("Error: There must be at least 1 row per page")
+        return
+
+    GameThread(target=dump_html, args=(order_by, page_size)).start()
+
+
+@TypedServerCommand(['mc', 'db', 'dump_txt'])
+def callback(command_info):
+    GameThread(target=dump_txt).start()
+
 
 @TypedServerCommand(['mc', 'db', 'save'])
 def callback(command_info):
@@ -215,6 +604,9 @@ def callback(command_info):
 
 @TypedServerCommand(['mc', 'db', 'set_old'])
 def callback(command_info, map_name:str):
+    from .models import ServerMap as DB_ServerMap
+    from .orm import Session
+
     session = Session()
 
     db_server_map = session.query(DB_ServerMap).filter_by(
@@ -234,20 +626,26 @@ def callback(command_info, map_name:str):
 
 @TypedServerCommand(['mc', 'db', 'set_old_all'])
 def callback(command_info):
+    from .models import ServerMap as DB_ServerMap
+    from .orm import Session
+
     session = Session()
 
-    for db_server_map in session.query(DB_ServerMap).all():
-        db_server_map.detected = 0
+    updated = session.query(DB_ServerMap).update(
+        {DB_ServerMap.detected: 0}, synchronize_session=False)
 
     session.commit()
 
-    echo_console("Operation succeeded.")
+    echo_console("Operation succeeded, {} maps marked as old.".format(updated))
 
     session.close()
 
 
 @TypedServerCommand(['mc', 'db', 'forget_map'])
 def callback(command_info, map_name:str):
+    from .models import ServerMap as DB_ServerMap
+    from .orm import Session
+
     session = Session()
 
     db_server_map = session.query(DB_ServerMap).filter_by(
@@ -267,50 +665,4 @@ def callback(command_info, map_name:str):
 
 @TypedServerCommand(['mc', 'scan_maps_folder'])
 def callback(command_info, *prefixes:str):
-        if prefixes:
-            prefixes = list(map(lambda prefix: prefix.lower(), prefixes))
-            echo_console("Scanning maps only with the "
-                         "following prefixes:\n{}".format(','.join(prefixes)))
-
-            def is_valid_map(path):
-                if path.ext.lower() != ".bsp":
-                    return False
-
-                map_name = path.namebase.lower()
-                for prefix in prefixes:
-                    if map_name.startswith(prefix):
-                        return True
-
-                return False
-
-        else:
-            echo_console("Scanning all maps...")
-
-            def is_valid_map(path):
-                return path.ext.lower() == ".bsp"
-
-        rs = []
-
-        for map_path in MAPS_DIR.files():
-            if is_valid_map(map_path):
-                rs.append(map_path.namebase.lower())
-
-        if WORKSHOP_DIR.isdir():
-            echo_console(
-                "Found /maps/workshop dir! Scanning Steam Workshop maps...")
-
-            for subdir_path in WORKSHOP_DIR.dirs():
-                subdir_name = subdir_path.namebase.lower()
-
-                for map_path in subdir_path.files():
-                    map_name = map_path.namebase.lower()
-
-                    if is_valid_map(map_path):
-                        rs.append(f"workshop/{subdir_name}/{map_name}")
-
-        with open(MAPCYCLE_TXT_PATH1, 'w') as f:
-            for map_name in rs:
-                f.write(map_name + '\n')
-
-        echo_console("{} maps were scanned and written to "
-                     "mapcycle.txt".format(len(rs)))
+    scan_maps_folder(prefixes)
@@ -5,43 +5,53 @@
 from time import time
 
 # Source.Python
-from messages import SayText2
 from players.dictionary import PlayerDictionary
 from players.entity import Player
 
 # Map Cycle
 from .cvars import config_manager
+from .journal import journal, JournalEntry
+from .message_dispatcher import message_dispatcher
+from .metrics import metrics
+from .profiler import profiler
+from .scheduler import scheduler
+from .server_maps import server_map_manager
 from .session_players import session_players
 from .status import status, VoteStatus
-from .strings import COLOR_SCHEME, common_strings
+from .strings import common_strings
+from .voting_methods import ballot_box, get_voting_method
 
 
 # =============================================================================
 # >> FUNCTIONS
 # =============================================================================
+@profiler.profile('tell')
 def tell(players, message):
     """Send a SayText2 message to a list of Player instances."""
     if isinstance(players, Player):
         players = (players, )
 
-    player_indexes = [player.index for player in players]
-
-    message = message.tokenized(**message.tokens, **COLOR_SCHEME)
-    message = common_strings['chat_base'].tokenized(
-        message=message, **COLOR_SCHEME)
-
-    SayText2(message=message).send(*player_indexes)
+    message_dispatcher.tell([player.index for player in players], message)
 
 
+@profiler.profile('broadcast')
 def broadcast(message):
     """Send a SayText2 message to all registered users."""
-    tell([mcplayer.player for mcplayer in mcplayers.values()], message)
+    message_dispatcher.tell(tuple(mcplayers), message)
 
 
 # =============================================================================
 # >> CLASSES
 # =============================================================================
 class MCPlayerDictionary(PlayerDictionary):
+    def get_human_indexes(self):
+        return tuple(index for index, mcplayer in self.items()
+                     if not mcplayer.is_bot())
+
+    def get_human_steamids(self):
+        return tuple(mcplayer.session_player.steamid
+                     for mcplayer in self.values() if not mcplayer.is_bot())
+
     def get_nominated_maps(self):
         for mcplayer in self.values():
             if mcplayer.nominated_map is None:
@@ -60,6 +70,13 @@ class MCPlayerDictionary(PlayerDictionary):
 
             yield mcplayer.voted_map
 
+    def get_ballots(self):
+        for mcplayer in self.values():
+            if not mcplayer.ballot:
+                continue
+
+            yield mcplayer.ballot
+
     def reset_voted_maps(self):
         for mcplayer in self.values():
             mcplayer.reset(reset_voted_map=True)
@@ -108,6 +125,8 @@ class MCPlayer:
         self.player = Player(index)
 
         self._voted_map = None
+        self._ballot = ballot_box.new_ballot()
+        self._ballot_complete = False
         self._nominated_map = None
         self._used_rtv = False
 
@@ -118,6 +137,14 @@ class MCPlayer:
     def voted_map(self):
         return self._voted_map
 
+    @property
+    def ballot(self):
+        return self._ballot
+
+    @property
+    def ballot_complete(self):
+        return self._ballot_complete
+
     @property
     def nominated_map(self):
         return self._nominated_map
@@ -134,6 +161,8 @@ class MCPlayer:
 
         if reset_voted_map:
             self._voted_map = None
+            self._ballot = ballot_box.new_ballot()
+            self._ballot_complete = False
 
         if reset_nominated_map:
             self._nominated_map = None
@@ -144,6 +173,25 @@ class MCPlayer:
     def send_popup(self, popup):
         popup.send(self.player.index)
 
+    def get_pending_choices(self):
+        """Return maps the player has already picked during the current
+        multiple-choice ballot."""
+        if self._ballot_complete:
+            return ()
+
+        return tuple(
+            ballot_box.candidates[candidate_id]
+            for candidate_id in self._ballot)
+
+    def complete_ballot(self):
+        from ..map_cycle import check_if_enough_votes
+
+        if self._voted_map is None or self._ballot_complete:
+            return
+
+        self._ballot_complete = True
+        check_if_enough_votes()
+
     def get_vote_denial_reason(self):
         if not config_manager['votemap_enable']:
             return common_strings['error disabled']
@@ -151,7 +199,7 @@ class MCPlayer:
         if status.vote_status != VoteStatus.IN_PROGRESS:
             return common_strings['error not_in_progress']
 
-        if (self._voted_map is not None and
+        if (self._ballot_complete and
                 not config_manager['votemap_allow_revote']):
 
             return common_strings['error already_voted'].tokenized(
@@ -217,34 +265,68 @@ class MCPlayer:
         return None
 
     def vote_callback(self, map_):
-        from ..map_cycle import check_if_enough_votes
+        from .server_maps import whatever_entry
+        from .vote_progress_bar import vote_progress_bar
 
         reason = self.get_vote_denial_reason()
         if reason is not None:
             tell(self.player, reason)
             return
 
-        self._voted_map = map_
+        # Revoting starts a new ballot
+        if self._ballot_complete:
+            self.reset(reset_voted_map=True)
 
-        if config_manager['votemap_chat_reaction'] == 3:
+        if map_ in ballot_box:
+            candidate_id = ballot_box.get_id(map_)
 
-            # Show both name and choice
-            broadcast(common_strings['chat_reaction3'].tokenized(
-                      player=self.player.name, map=map_.name))
+            # Picking the same map twice doesn't make it count twice
+            if candidate_id in self._ballot:
+                tell(self.player, common_strings['vote_next_choice'].tokenized(
+                    choice=len(self._ballot) + 1))
 
-        elif config_manager['votemap_chat_reaction'] == 1:
+                return
 
-            # Show the name only
-            broadcast(common_strings['chat_reaction1'].tokenized(
-                player=self.player.name))
+            self._ballot.append(candidate_id)
 
-        elif config_manager['votemap_chat_reaction'] == 2:
+        # Only the first choice is shown in chat and in the progress bar
+        if self._voted_map is None:
+            self._voted_map = map_
+            map_.votes += 1
+            vote_progress_bar.count_vote(map_)
 
-            # Show the choice only
-            broadcast(common_strings['chat_reaction2'].tokenized(
-                map=map_.name))
+            if config_manager['votemap_chat_reaction'] == 3:
 
-        check_if_enough_votes()
+                # Show both name and choice
+                broadcast(common_strings['chat_reaction3'].tokenized(
+                          player=self.player.name, map=map_.name))
+
+            elif config_manager['votemap_chat_reaction'] == 1:
+
+                # Show the name only
+                broadcast(common_strings['chat_reaction1'].tokenized(
+                    player=self.player.name))
+
+            elif config_manager['votemap_chat_reaction'] == 2:
+
+                # Show the choice only
+                broadcast(common_strings['chat_reaction2'].tokenized(
+                    map=map_.name))
+
+        if (map_ is whatever_entry or
+                len(self._ballot) >= self._get_max_choices()):
+
+            self.complete_ballot()
+        else:
+            tell(self.player, common_strings['vote_next_choice'].tokenized(
+                choice=len(self._ballot) + 1))
+
+    def _get_max_choices(self):
+        if not get_voting_method().multiple_choice:
+            return 1
+
+        # Don't ask for more choices than there are candidates
+        return min(config_manager['votemap_max_choices'], len(ballot_box))
 
     def nominate_callback(self, map_):
         reason = self.get_nominate_denial_reason()
@@ -252,6 +334,13 @@ class MCPlayer:
             tell(self.player, reason)
             return
 
+        # Player count might've changed since the menu was sent
+        if map_ not in server_map_manager.get_eligible_maps(len(mcplayers)):
+            tell(self.player, common_strings['error not_eligible'].tokenized(
+                map=map_.name, players=len(mcplayers)))
+
+            return
+
         self._nominated_map = map_
 
         broadcast(common_strings['nominated'].tokenized(
@@ -266,6 +355,7 @@ class MCPlayer:
             return
 
         self._used_rtv = True
+        metrics.rtv_requests += 1
 
         broadcast(common_strings['used_rtv'].tokenized(
             player=self.player.name))
@@ -280,6 +370,12 @@ class MCPlayer:
 
         self.session_player.rating = rating
 
+        # Don't lose the rating if the server crashes before the map ends
+        if status.current_map is not None and rating != 0:
+            journal.append(
+                JournalEntry.LIKES if rating == 1 else JournalEntry.DISLIKES,
+                status.current_map.filename)
+
     def nextmap_callback(self):
         reason = self.get_nextmap_denial_reason()
         if reason is not None:
@@ -306,7 +402,12 @@ class MCPlayer:
             tell(self.player, common_strings['timeleft_last_round'])
             return
 
-        seconds = int(status.map_end_time - time())
+        seconds = scheduler.get_time_left('change_level')
+        if seconds is None:
+            tell(self.player, common_strings['timeleft_never'])
+            return
+
+        seconds = int(seconds)
         minutes, seconds = divmod(seconds, 60)
         hours, minutes = divmod(minutes, 60)
         tell(self.player, common_strings['timeleft_timeleft'].tokenized(
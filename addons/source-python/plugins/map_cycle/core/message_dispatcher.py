@@ -0,0 +1,129 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+from collections import Counter
+
+# Source.Python
+from listeners.tick import Delay
+from messages import SayText2
+from players.helpers import get_client_language
+
+# Map Cycle
+from .render_cache import render_cache
+from .strings import COLOR_SCHEME, common_strings
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+# Placeholder used to split rendered chat_base into its head and tail
+CHAT_BASE_SENTINEL = "\0message\0"
+
+# Colors are rendered in advance so that chat messages can be cached
+CHAT_COLOR_TOKENS = {
+    token: str(color) for token, color in COLOR_SCHEME.items()}
+
+
+# =============================================================================
+# >> CLASSES
+# =============================================================================
+class MessageDispatcher:
+    """Coalesce chat messages queued during the same tick.
+
+    Messages are rendered per language at the moment they're queued and
+    are only sent on the next tick, in the order they were queued.
+    Players that end up with the same text share a single SayText2, as
+    long as that doesn't reorder what any of them receives.
+    """
+    def __init__(self):
+        # (text, Counter of player indexes) in the order they're sent
+        self._queue = []
+        self._flush_delay = None
+        self._chat_bases = {}
+
+    def __len__(self):
+        return sum(len(counter) for text, counter in self._queue)
+
+    def _get_chat_base(self, language):
+        try:
+            return self._chat_bases[language]
+        except KeyError:
+            pass
+
+        head, tail = common_strings['chat_base'].get_string(
+            language, message=CHAT_BASE_SENTINEL, **CHAT_COLOR_TOKENS
+        ).split(CHAT_BASE_SENTINEL)
+
+        self._chat_bases[language] = head, tail
+        return head, tail
+
+    def render_chat(self, message, language):
+        head, tail = self._get_chat_base(language)
+        return head + render_cache.render(
+            message, language, **CHAT_COLOR_TOKENS) + tail
+
+    def tell(self, player_indexes, message):
+        """Queue a SayText2 message to the given player indexes."""
+        rendered = {}
+        recipients = {}
+        for index in player_indexes:
+            language = get_client_language(index)
+            try:
+                text = rendered[language]
+            except KeyError:
+                text = rendered[language] = self.render_chat(
+                    message, language)
+
+            recipients.setdefault(text, []).append(index)
+
+        for text, indexes in recipients.items():
+            self._enqueue(text, indexes)
+
+        if self._queue and self._flush_delay is None:
+            self._flush_delay = Delay(0, self.flush)
+
+    def _enqueue(self, text, indexes):
+        # Join an earlier SayText2 with the same text, unless one of these
+        # players has something else queued after it
+        for queued_text, counter in reversed(self._queue):
+            if queued_text == text:
+                counter.update(indexes)
+                return
+
+            if not counter.keys().isdisjoint(indexes):
+                break
+
+        self._queue.append((text, Counter(indexes)))
+
+    def send_popup(self, popup, player_indexes):
+        """Send the popup to all given player indexes in one call.
+
+        Chat messages queued before it are sent first.
+        """
+        if player_indexes:
+            self.flush()
+            popup.send(*player_indexes)
+
+    def flush(self):
+        """Send everything that was queued so far."""
+        if self._flush_delay is not None:
+            if self._flush_delay.running:
+                self._flush_delay.cancel()
+
+            self._flush_delay = None
+
+        queue, self._queue = self._queue, []
+        for text, counter in queue:
+
+            # The same player may have received the same text more than
+            # once, e.g. two anonymous chat reactions for the same map
+            while counter:
+                SayText2(message=text).send(*counter)
+                counter -= Counter(counter.keys())
+
+    def clear_cache(self):
+        self._chat_bases.clear()
+
+# The singleton object of the MessageDispatcher class
+message_dispatcher = MessageDispatcher()
@@ -0,0 +1,165 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+import os
+
+# Source.Python
+from listeners.tick import GameThread
+
+# Map Cycle
+from .cvars import config_manager
+from .message_dispatcher import message_dispatcher
+from .paths import METRICS_PATH
+from .render_cache import render_cache
+from .scheduler import scheduler
+from .server_maps import server_map_manager
+from .status import status
+
+
+# =============================================================================
+# >> FUNCTIONS
+# =============================================================================
+def _escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n')
+
+
+def write_metrics_file(text):
+    """Atomically replace the metrics file with the given text."""
+    METRICS_PATH.parent.makedirs_p()
+
+    tmp_path = METRICS_PATH + ".tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+
+    os.replace(tmp_path, METRICS_PATH)
+
+
+# =============================================================================
+# >> CLASSES
+# =============================================================================
+class Metrics:
+    """Counters exported to a Prometheus text format file.
+
+    The text is rendered on the game thread, so that no plugin state is
+    read concurrently, and only the disk write happens in a thread.
+    """
+    def __init__(self):
+        self.votes_started = 0
+        self.votes_finished = 0
+        self.ballots_counted = 0
+        self.vote_duration_sum = 0.0
+        self.rtv_requests = 0
+        self.rtv_votes = 0
+        self.db_flushes = 0
+        self.db_flush_duration_sum = 0.0
+        self.db_flush_duration_last = 0.0
+
+        self._writer = None
+
+    def vote_started(self):
+        self.votes_started += 1
+
+    def vote_finished(self, duration, ballots):
+        self.votes_finished += 1
+        self.vote_duration_sum += duration
+        self.ballots_counted += ballots
+
+    def db_flushed(self, duration):
+        self.db_flushes += 1
+        self.db_flush_duration_sum += duration
+        self.db_flush_duration_last = duration
+
+    def render(self):
+        lookups = render_cache.hits + render_cache.misses
+        lines = []
+
+        def add(name, type_, help_, value, labels=""):
+            lines.append("# HELP mapcycle_{} {}".format(name, help_))
+            lines.append("# TYPE mapcycle_{} {}".format(name, type_))
+            lines.append("mapcycle_{}{} {}".format(name, labels, value))
+
+        add('maps_loaded', 'gauge',
+            "Maps loaded from mapcycle.json.", len(server_map_manager))
+        add('maps_playable', 'gauge',
+            "Maps not hidden by their time restrictions.",
+            len(server_map_manager.playable_maps))
+        add('votes_started_total', 'counter',
+            "Map votes launched.", self.votes_started)
+        add('rtv_votes_total', 'counter',
+            "Map votes launched by RTV.", self.rtv_votes)
+        add('rtv_requests_total', 'counter',
+            "Accepted !rtv requests.", self.rtv_requests)
+        add('votes_finished_total', 'counter',
+            "Map votes finished.", self.votes_finished)
+        add('ballots_counted_total', 'counter',
+            "Ballots counted in finished votes.", self.ballots_counted)
+
+        lines.append("# HELP mapcycle_vote_duration_seconds "
+                     "Duration of finished map votes.")
+        lines.append("# TYPE mapcycle_vote_duration_seconds summary")
+        lines.append("mapcycle_vote_duration_seconds_sum {}".format(
+            self.vote_duration_sum))
+        lines.append("mapcycle_vote_duration_seconds_count {}".format(
+            self.votes_finished))
+
+        lines.append("# HELP mapcycle_db_flush_duration_seconds "
+                     "Duration of saving maps to the database.")
+        lines.append("# TYPE mapcycle_db_flush_duration_seconds summary")
+        lines.append("mapcycle_db_flush_duration_seconds_sum {}".format(
+            self.db_flush_duration_sum))
+        lines.append("mapcycle_db_flush_duration_seconds_count {}".format(
+            self.db_flushes))
+
+        add('db_flush_last_duration_seconds', 'gauge',
+            "Duration of the last save to the database.",
+            self.db_flush_duration_last)
+        add('message_queue_depth', 'gauge',
+            "Chat messages waiting for the next tick.",
+            len(message_dispatcher))
+        add('render_cache_hits_total', 'counter',
+            "Render cache hits.", render_cache.hits)
+        add('render_cache_misses_total', 'counter',
+            "Render cache misses.", render_cache.misses)
+        add('render_cache_hit_ratio', 'gauge',
+            "Share of render cache lookups that were hits.",
+            render_cache.hits / lookups if lookups else 0)
+
+        if status.current_map is not None:
+            labels = '{{map="{}"}}'.format(
+                _escape_label(status.current_map.filename))
+
+            add('current_map_likes', 'gauge',
+                "Likes of the current map.", status.current_map.likes,
+                labels)
+            add('current_map_dislikes', 'gauge',
+                "Dislikes of the current map.",
+                status.current_map.dislikes, labels)
+
+        return '\n'.join(lines) + '\n'
+
+    def write(self):
+        # Don't pile up writers if the disk is slow
+        if self._writer is not None and self._writer.is_alive():
+            return
+
+        self._writer = GameThread(
+            target=write_metrics_file, args=(self.render(), ))
+
+        self._writer.start()
+
+    def start(self):
+        """(Re)start writing the metrics file, if it's enabled."""
+        self.stop()
+
+        if config_manager['metrics_interval'] > 0:
+            scheduler.schedule(
+                'metrics', config_manager['metrics_interval'], self.write,
+                interval=config_manager['metrics_interval'])
+
+    def stop(self):
+        scheduler.cancel('metrics')
+
+# The singleton object of the Metrics class
+metrics = Metrics()
@@ -1,7 +1,8 @@
-from sqlalchemy import Boolean, Column, Float, Integer, String
+from sqlalchemy import Boolean, Column, Float, Integer, String, text
 
 from .config import config
-from .orm import Base
+from .orm import (
+    Base, create_missing_columns, create_missing_indexes, engine)
 
 
 class ServerMap(Base):
@@ -9,8 +10,27 @@ class ServerMap(Base):
 
     id = Column(Integer, primary_key=True)
     filename = Column(String(64))
-    detected = Column(Integer)
-    likes = Column(Integer)
+    detected = Column(Integer, index=True)
+    likes = Column(Integer, index=True)
     dislikes = Column(Integer)
-    man_hours = Column(Float)
-    av_session_len = Column(Float)
+    wilson_score = Column(Float, index=True)
+    man_hours = Column(Float, index=True)
+    av_session_len = Column(Float, index=True)
+    plays = Column(Integer, index=True, default=0, server_default=text('0'))
+
+
+class PlayerMap(Base):
+    __tablename__ = config['database']['prefix'] + "player_maps"
+
+    id = Column(Integer, primary_key=True)
+    steamid = Column(String(32), index=True)
+    filename = Column(String(64), index=True)
+    rating = Column(Integer, default=0)
+    votes = Column(Integer, default=0)
+    plays = Column(Integer, default=0)
+
+
+# Tables are created when the models are first needed
+Base.metadata.create_all(engine)
+create_missing_columns(Base.metadata)
+create_missing_indexes(Base.metadata)
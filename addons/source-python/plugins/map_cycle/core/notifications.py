@@ -0,0 +1,41 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Source.Python
+from listeners import ListenerManager, ListenerManagerDecorator
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+# Called with the sorted tuple of map filenames and its version
+on_map_list_changed_listener_manager = ListenerManager()
+
+# Called with the filename of the map that will be played next
+on_next_map_set_listener_manager = ListenerManager()
+
+# Called with the tuple of map filenames that are offered in the vote
+on_vote_started_listener_manager = ListenerManager()
+
+# Called with the filename of the winner map, None if the current map was
+# extended or there was nothing to choose from
+on_vote_finished_listener_manager = ListenerManager()
+
+
+# =============================================================================
+# >> CLASSES
+# =============================================================================
+class OnMapListChanged(ListenerManagerDecorator):
+    manager = on_map_list_changed_listener_manager
+
+
+class OnNextMapSet(ListenerManagerDecorator):
+    manager = on_next_map_set_listener_manager
+
+
+class OnVoteStarted(ListenerManagerDecorator):
+    manager = on_vote_started_listener_manager
+
+
+class OnVoteFinished(ListenerManagerDecorator):
+    manager = on_vote_finished_listener_manager
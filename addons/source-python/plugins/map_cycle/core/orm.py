@@ -2,9 +2,10 @@
 # >> IMPORTS
 # =============================================================================
 # Site-Package
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateColumn
 
 # Map Cycle
 from .config import config
@@ -19,3 +20,41 @@ engine = create_engine(config['database']['uri'].format(
 ))
 Base = declarative_base()
 Session = sessionmaker(bind=engine)
+
+
+# =============================================================================
+# >> FUNCTIONS
+# =============================================================================
+def create_missing_columns(metadata):
+    """Add columns that were added to the models after their tables.
+
+    Such columns must either be nullable or have a server default.
+    """
+    inspector = inspect(engine)
+    for table in metadata.sorted_tables:
+        existing_names = set(
+            column['name'] for column in inspector.get_columns(table.name))
+
+        for column in table.columns:
+            if column.name in existing_names:
+                continue
+
+            column_ddl = CreateColumn(column).compile(dialect=engine.dialect)
+            with engine.begin() as connection:
+                connection.execute(text("ALTER TABLE {} ADD COLUMN {}".format(
+                    table.name, column_ddl)))
+
+
+def create_missing_indexes(metadata):
+    """Create indexes that were added to the models after their tables.
+
+    metadata.create_all() skips existing tables altogether.
+    """
+    inspector = inspect(engine)
+    for table in metadata.sorted_tables:
+        existing_names = set(
+            index['name'] for index in inspector.get_indexes(table.name))
+
+        for index in table.indexes:
+            if index.name not in existing_names:
+                index.create(engine)
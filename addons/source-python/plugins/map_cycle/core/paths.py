@@ -32,4 +32,8 @@ DEFAULT_MAPCYCLE_TXT_PATH = GAME_PATH / "cfg" / "mapcycle_default.txt"
 DBDUMP_DIR = LOG_PATH / info.name
 DBDUMP_HTML_PATH = DBDUMP_DIR / "databasedump.html"
 DBDUMP_TXT_PATH = DBDUMP_DIR / "databasedump.txt"
+METRICS_PATH = DBDUMP_DIR / "metrics.prom"
+TRACE_PATH = DBDUMP_DIR / "trace.jsonl"
+JOURNAL_PATH = MC_DATA_PATH / "journal.bin"
 TEMPLATES_DIR = MC_DATA_PATH / "templates"
+TEMPLATES_CACHE_DIR = MC_DATA_PATH / "templates_cache"
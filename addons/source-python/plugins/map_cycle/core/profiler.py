@@ -0,0 +1,138 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+from functools import wraps
+from threading import get_ident
+from time import perf_counter
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+# Bucket N holds durations shorter than 2^N microseconds, the last bucket
+# holds everything that's longer than ~35 minutes
+HISTOGRAM_SIZE = 32
+
+
+# =============================================================================
+# >> CLASSES
+# =============================================================================
+class Histogram:
+    """Fixed-size histogram of durations with power-of-two buckets."""
+    def __init__(self):
+        self.buckets = [0] * HISTOGRAM_SIZE
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, duration):
+        microseconds = int(duration * 1000000)
+        self.buckets[min(microseconds.bit_length(), HISTOGRAM_SIZE - 1)] += 1
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+
+    def percentile(self, percent):
+        """Return upper bound of the given percentile (in seconds)."""
+        if not self.count:
+            return 0.0
+
+        threshold = self.count * percent / 100
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= threshold:
+                return min((1 << bucket) / 1000000, self.max)
+
+        return self.max
+
+    def reset(self):
+        self.buckets = [0] * HISTOGRAM_SIZE
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class Profiler:
+    """Collect timings of the profiled sections while enabled.
+
+    Sections can also be traced by the watchdog. When neither is going
+    on, a profiled call only costs two attribute checks.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.histograms = {}
+
+        # (depth, section, duration) of the sections that were left while
+        # somebody is tracing, None if nobody is
+        self._trace = None
+        self._trace_thread = None
+        self._depth = 0
+
+    def get_histogram(self, section):
+        try:
+            return self.histograms[section]
+        except KeyError:
+            histogram = self.histograms[section] = Histogram()
+            return histogram
+
+    def profile(self, section):
+        """Decorate a function to time its calls under the given name."""
+        histogram = self.get_histogram(section)
+
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled and self._trace is None:
+                    return func(*args, **kwargs)
+
+                trace = self._trace
+                if trace is not None and get_ident() != self._trace_thread:
+                    trace = None
+
+                depth = self._depth
+                if trace is not None:
+                    self._depth += 1
+
+                start = perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    duration = perf_counter() - start
+                    if self.enabled:
+                        histogram.add(duration)
+
+                    if trace is not None:
+                        self._depth = depth
+                        trace.append((depth, section, duration))
+
+            return wrapper
+
+        return decorator
+
+    def start_trace(self):
+        """Start recording nested sections entered by this thread."""
+        self._trace = []
+        self._trace_thread = get_ident()
+        self._depth = 0
+
+    def stop_trace(self):
+        """Stop recording and return the recorded sections."""
+        trace, self._trace = self._trace, None
+        self._trace_thread = None
+        return trace or []
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+    def report(self):
+        """Yield (section, calls, p50, p95, max) for every section."""
+        for section, histogram in sorted(self.histograms.items()):
+            yield (section, histogram.count, histogram.percentile(50),
+                   histogram.percentile(95), histogram.max)
+
+# The singleton object of the Profiler class
+profiler = Profiler()
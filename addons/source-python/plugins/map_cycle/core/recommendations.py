@@ -0,0 +1,229 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+from array import array
+from threading import Lock
+
+# Site-Package
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+# How much every kind of activity tells about the player's taste, the sum
+# is then clipped to [-1, 1]
+RATING_WEIGHT = 1.0
+VOTE_WEIGHT = 0.25
+PLAY_WEIGHT = 0.05
+
+# Size of the player and map factor vectors
+FACTORS_RANK = 8
+FACTORS_REGULARIZATION = 0.1
+FACTORS_ITERATIONS = 10
+
+# How many observations are multiplied at once while solving the factors
+SOLVE_CHUNK_SIZE = 65536
+
+# How many rows are fetched from the database at once
+FIT_BATCH_SIZE = 10000
+
+
+# =============================================================================
+# >> FUNCTIONS
+# =============================================================================
+def solve_factors(rows, columns, values, row_count, factors):
+    """Find the factors of every row that best explain its observed values.
+
+    This is one half of an alternating least squares step, done for all
+    rows at once. Observations are given as (rows, columns, values)
+    arrays, only they are ever summed up, so the memory doesn't depend
+    on the number of rows times the number of columns.
+    """
+    rank = factors.shape[1]
+
+    # The outer products are symmetric, so only their upper triangles
+    # are summed up
+    upper = numpy.triu_indices(rank)
+    outer = (factors[:, :, None] * factors[:, None, :])[:, upper[0], upper[1]]
+
+    a_upper = numpy.zeros((len(upper[0]), row_count))
+    b = numpy.zeros((rank, row_count))
+    for start in range(0, len(rows), SOLVE_CHUNK_SIZE):
+        chunk = slice(start, start + SOLVE_CHUNK_SIZE)
+        chunk_rows = rows[chunk]
+        chunk_outer = outer[columns[chunk]].T
+        weighted = factors[columns[chunk]].T * values[chunk]
+
+        for k in range(len(a_upper)):
+            a_upper[k] += numpy.bincount(
+                chunk_rows, chunk_outer[k], minlength=row_count)
+
+        for k in range(rank):
+            b[k] += numpy.bincount(
+                chunk_rows, weighted[k], minlength=row_count)
+
+    a = numpy.empty((row_count, rank, rank))
+    a[:, upper[0], upper[1]] = a_upper.T
+    a[:, upper[1], upper[0]] = a_upper.T
+    a += numpy.eye(rank) * FACTORS_REGULARIZATION
+    return numpy.linalg.solve(a, b.T[:, :, None])[:, :, 0]
+
+
+def fit_factors(rows):
+    """Factorize (steamid, filename, rating, votes, plays) rows.
+
+    Return (player indexes, player factors, map filenames, map factors).
+    """
+    player_indexes = {}
+    map_indexes = {}
+    players = array('l')
+    maps = array('l')
+    values = array('d')
+    for steamid, filename, rating, votes, plays in rows:
+        players.append(player_indexes.setdefault(
+            steamid, len(player_indexes)))
+
+        maps.append(map_indexes.setdefault(filename, len(map_indexes)))
+        values.append(
+            rating * RATING_WEIGHT + votes * VOTE_WEIGHT +
+            plays * PLAY_WEIGHT)
+
+    players = numpy.frombuffer(players, dtype='l')
+    maps = numpy.frombuffer(maps, dtype='l')
+    values = numpy.clip(numpy.frombuffer(values), -1, 1)
+
+    random_state = numpy.random.RandomState(0)
+    player_factors = random_state.normal(
+        scale=0.1, size=(len(player_indexes), FACTORS_RANK))
+
+    map_factors = random_state.normal(
+        scale=0.1, size=(len(map_indexes), FACTORS_RANK))
+
+    for i in range(FACTORS_ITERATIONS):
+        player_factors = solve_factors(
+            players, maps, values, len(player_indexes), map_factors)
+
+        map_factors = solve_factors(
+            maps, players, values, len(map_indexes), player_factors)
+
+    return player_indexes, player_factors, tuple(map_indexes), map_factors
+
+
+# =============================================================================
+# >> CLASSES
+# =============================================================================
+class Recommender:
+    """Predict how much the players online will like every map.
+
+    Ratings, votes and plays of every player are kept in the database.
+    The player x map matrix of them is factorized in a background thread,
+    after that a prediction for a group of players is one dot product
+    per map.
+    """
+    def __init__(self):
+        self._pending = {}
+        self._pending_lock = Lock()
+        self._model = None
+
+    @property
+    def available(self):
+        return numpy is not None
+
+    def _get_pending(self, steamid, filename):
+        key = (steamid, filename.lower())
+        try:
+            return self._pending[key]
+        except KeyError:
+            activity = self._pending[key] = [0, 0, 0]
+            return activity
+
+    def record_rating(self, steamid, filename, rating):
+        with self._pending_lock:
+            self._get_pending(steamid, filename)[0] = rating
+
+    def record_vote(self, steamid, filename):
+        with self._pending_lock:
+            self._get_pending(steamid, filename)[1] += 1
+
+    def record_play(self, steamid, filename):
+        with self._pending_lock:
+            self._get_pending(steamid, filename)[2] += 1
+
+    def save(self):
+        """Add the recorded activity to the database."""
+        from .models import PlayerMap
+        from .orm import Session
+
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+
+        if not pending:
+            return
+
+        session = Session()
+        for (steamid, filename), (rating, votes, plays) in pending.items():
+            player_map = session.query(PlayerMap).filter_by(
+                steamid=steamid, filename=filename).first()
+
+            if player_map is None:
+                player_map = PlayerMap(
+                    steamid=steamid, filename=filename, rating=0, votes=0,
+                    plays=0)
+
+                session.add(player_map)
+
+            # Only the latest rating counts
+            if rating:
+                player_map.rating = rating
+
+            player_map.votes += votes
+            player_map.plays += plays
+
+        session.commit()
+        session.close()
+
+    def fit(self):
+        """Refit the model to the database.
+
+        This takes a while, so it must not be called from the game thread.
+        """
+        from .models import PlayerMap
+        from .orm import Session
+
+        session = Session()
+        rows = session.query(
+            PlayerMap.steamid, PlayerMap.filename, PlayerMap.rating,
+            PlayerMap.votes, PlayerMap.plays).yield_per(FIT_BATCH_SIZE)
+
+        model = fit_factors(rows)
+        session.close()
+
+        if model[0]:
+            self._model = model
+
+    def get_scores(self, steamids):
+        """Return {filename: predicted affinity} for the given players.
+
+        Return None if none of them is known yet.
+        """
+        if self._model is None:
+            return None
+
+        player_indexes, player_factors, filenames, map_factors = self._model
+
+        indexes = [player_indexes[steamid] for steamid in steamids
+                   if steamid in player_indexes]
+
+        if not indexes:
+            return None
+
+        group_factors = player_factors[indexes].mean(axis=0)
+        return dict(zip(filenames, (map_factors @ group_factors).tolist()))
+
+# The singleton object of the Recommender class
+recommender = Recommender()
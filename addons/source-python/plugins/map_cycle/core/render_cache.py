@@ -0,0 +1,105 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+from collections import OrderedDict
+
+# Source.Python
+from translations.manager import language_manager
+from translations.strings import TranslationStrings
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+RENDER_CACHE_SIZE = 4096
+
+
+# =============================================================================
+# >> FUNCTIONS
+# =============================================================================
+def cached_tokenized(translation_strings, **tokens):
+    """Return tokenized copy of the given strings that renders through
+    the render cache."""
+    new_translation_strings = CachedTranslationStrings()
+    new_translation_strings.tokens.update(translation_strings.tokens)
+    new_translation_strings.tokens.update(tokens)
+    new_translation_strings.update(translation_strings)
+    return new_translation_strings
+
+
+# =============================================================================
+# >> CLASSES
+# =============================================================================
+class RenderCache:
+    """LRU cache of rendered TranslationStrings.
+
+    The language-specific template text stands in for the (string id,
+    language) pair, so the key is that text plus all tokens. Nested
+    TranslationStrings tokens are rendered (and cached) first.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        return len(self._cache)
+
+    def render(self, translation_strings, language=None, **tokens):
+        language = (language_manager.get_language(language) or
+                    language_manager.default)
+
+        if language not in translation_strings:
+            language = language_manager.default
+            if language not in translation_strings:
+                language = language_manager.fallback
+
+        template = translation_strings.get(language)
+        if template is None:
+            return TranslationStrings.get_string(
+                translation_strings, language, **tokens)
+
+        language_tokens = dict(translation_strings.tokens)
+        language_tokens.update(tokens)
+        for token, value in language_tokens.items():
+            if isinstance(value, TranslationStrings):
+                language_tokens[token] = self.render(value, language, **tokens)
+
+        try:
+            key = (template, frozenset(language_tokens.items()))
+            rendered = self._cache[key]
+
+        except TypeError:
+
+            # Some token can't be hashed, render without caching
+            return template.format(**language_tokens)
+
+        except KeyError:
+            self.misses += 1
+
+            rendered = self._cache[key] = template.format(**language_tokens)
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+        else:
+            self.hits += 1
+            self._cache.move_to_end(key)
+
+        return rendered
+
+    def clear(self):
+        self._cache.clear()
+
+# The singleton object of the RenderCache class
+render_cache = RenderCache(RENDER_CACHE_SIZE)
+
+
+class CachedTranslationStrings(TranslationStrings):
+    """TranslationStrings that are rendered through the render cache."""
+    def get_string(self, language=None, **tokens):
+        return render_cache.render(self, language, **tokens)
+
+    def tokenized(self, **tokens):
+        return cached_tokenized(self, **tokens)
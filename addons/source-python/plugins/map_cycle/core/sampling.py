@@ -0,0 +1,90 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+from random import randrange
+
+
+# =============================================================================
+# >> CLASSES
+# =============================================================================
+class WeightedSampler:
+    """Draw items without replacement, proportionally to their weights.
+
+    Weights are integers kept in a Fenwick tree, so that every draw and
+    every weight update costs O(log n) and no rounding errors pile up.
+    """
+    def __init__(self, items, weights):
+        self.items = tuple(items)
+        self._weights = [max(int(weight), 0) for weight in weights]
+        self._positions = {item: i for i, item in enumerate(self.items)}
+
+        size = len(self._weights)
+        tree = [0] + self._weights
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+
+        self._tree = tree
+        self._total = sum(self._weights)
+        self._top_bit = 1 << (size.bit_length() - 1) if size else 0
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def total(self):
+        return self._total
+
+    def _add(self, position, delta):
+        self._total += delta
+
+        i = position + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _find(self, value):
+        """Return position of the item that covers the given value of
+        the cumulative weight."""
+        position = 0
+        bit = self._top_bit
+        while bit:
+            next_position = position + bit
+            if (next_position < len(self._tree) and
+                    self._tree[next_position] <= value):
+
+                position = next_position
+                value -= self._tree[position]
+
+            bit >>= 1
+
+        return position
+
+    def sample(self, number, exclude=()):
+        """Return up to the given number of distinct items.
+
+        Excluded items and items with zero weight are never drawn.
+        """
+        removed = []
+        for item in exclude:
+            position = self._positions.get(item)
+            if position is None or self._weights[position] == 0:
+                continue
+
+            self._add(position, -self._weights[position])
+            removed.append(position)
+
+        result = []
+        while len(result) < number and self._total > 0:
+            position = self._find(randrange(self._total))
+            self._add(position, -self._weights[position])
+            removed.append(position)
+            result.append(self.items[position])
+
+        # Put the weights back for the next vote
+        for position in removed:
+            self._add(position, self._weights[position])
+
+        return result
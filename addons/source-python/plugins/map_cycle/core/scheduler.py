@@ -0,0 +1,155 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+from heapq import heappop, heappush
+from itertools import count
+from time import time
+
+
+# =============================================================================
+# >> CLASSES
+# =============================================================================
+class Timer:
+    __slots__ = ('name', 'callback', 'args', 'interval', 'exec_time',
+                 'time_left', 'sequence')
+
+    def __init__(self, name, callback, args, interval):
+        self.name = name
+        self.callback = callback
+        self.args = args
+        self.interval = interval
+
+        # Only one of these is set: exec_time while the timer is running,
+        # time_left while it's paused
+        self.exec_time = None
+        self.time_left = None
+
+        # Heap entries with a different sequence number are stale
+        self.sequence = None
+
+    @property
+    def paused(self):
+        return self.exec_time is None
+
+
+class Scheduler:
+    """Named timers that are run from a single tick listener.
+
+    Timers are kept in a heap, so a tick with nothing to run only costs
+    one comparison. Scheduling a timer under a name that's already taken
+    replaces the old timer. Must only be used from the game thread.
+    """
+    def __init__(self):
+        self._timers = {}
+        self._heap = []
+        self._sequence = count()
+
+    def __contains__(self, name):
+        return name in self._timers
+
+    def schedule(self, name, seconds, callback, args=(), interval=None):
+        """Run the callback in the given number of seconds.
+
+        If interval is given (must be positive), the callback is then
+        repeated every interval seconds until the timer is cancelled.
+        """
+        self.cancel(name)
+
+        timer = self._timers[name] = Timer(name, callback, args, interval)
+        self._push(timer, time() + max(0, seconds))
+
+    def reschedule(self, name, seconds):
+        """Move the timer to run in the given number of seconds.
+
+        Paused timers stay paused, they will run that much time after
+        they're resumed.
+        """
+        timer = self._timers[name]
+        if timer.paused:
+            timer.time_left = max(0, seconds)
+        else:
+            self._push(timer, time() + max(0, seconds))
+
+    def cancel(self, name):
+        """Cancel the timer, return False if it wasn't scheduled."""
+        timer = self._timers.pop(name, None)
+        if timer is None:
+            return False
+
+        # Its heap entry will be skipped once it comes up
+        timer.sequence = None
+        return True
+
+    def cancel_all(self):
+        self._timers.clear()
+        self._heap.clear()
+
+    def pause(self, name):
+        timer = self._timers[name]
+        if timer.paused:
+            return
+
+        timer.time_left = max(0, timer.exec_time - time())
+        timer.exec_time = None
+        timer.sequence = None
+
+    def resume(self, name):
+        timer = self._timers[name]
+        if not timer.paused:
+            return
+
+        self._push(timer, time() + timer.time_left)
+        timer.time_left = None
+
+    def get_time_left(self, name):
+        """Return seconds until the timer runs, None if it's not scheduled.
+        """
+        timer = self._timers.get(name)
+        if timer is None:
+            return None
+
+        if timer.paused:
+            return timer.time_left
+
+        return max(0, timer.exec_time - time())
+
+    def get_timers(self):
+        """Yield (name, seconds left, interval, paused) for every timer."""
+        for name, timer in sorted(self._timers.items()):
+            yield name, self.get_time_left(name), timer.interval, timer.paused
+
+    def tick(self):
+        """Run all timers that are due."""
+        now = time()
+        while self._heap and self._heap[0][0] <= now:
+            exec_time, sequence, timer = heappop(self._heap)
+            if sequence != timer.sequence:
+                continue
+
+            if timer.interval is None:
+                del self._timers[timer.name]
+                timer.sequence = None
+            else:
+                # Don't try to catch up on the missed runs after a hitch
+                next_time = exec_time + timer.interval
+                if next_time <= now:
+                    next_time = now + timer.interval
+
+                self._push(timer, next_time)
+
+            try:
+                timer.callback(*timer.args)
+            except Exception:
+                from ..map_cycle import logger
+
+                logger.log_exception(
+                    "Timer '{}' has failed".format(timer.name))
+
+    def _push(self, timer, exec_time):
+        timer.exec_time = exec_time
+        timer.sequence = next(self._sequence)
+        heappush(self._heap, (exec_time, timer.sequence, timer))
+
+# The singleton object of the Scheduler class
+scheduler = Scheduler()
@@ -2,22 +2,95 @@
 # >> IMPORTS
 # =============================================================================
 # Python
+from bisect import bisect_right
 from datetime import datetime
+from math import sqrt
+from random import shuffle
+from time import time
 
 # Map Cycle
 from .cvars import config_manager
+from .render_cache import cached_tokenized
+from .sampling import WeightedSampler
+from .scheduler import scheduler
 from .strings import map_names_strings, popups_strings
+from .time_restrictions import (
+    clear_interned_bitmaps, compile_time_restriction, get_boundaries,
+    get_minute_of_week, is_set, MINUTES_PER_WEEK)
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+# Extra seconds to wait after a schedule boundary before re-checking
+# visibility, so that we don't wake up a moment too early
+SCHEDULE_BOUNDARY_MARGIN = 1
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# Sampling weights are scaled to integers before they go to the sampler
+SAMPLING_WEIGHT_SCALE = 1000
+
+# Wilson score interval confidence (1.96 = 95%)
+WILSON_Z = 1.96
+
+# Fields that ServerMapManager.get_stats() can collect
+MAP_STAT_FIELDS = (
+    'filename', 'name', 'likes', 'dislikes', 'rating', 'wilson_score',
+    'nominations',
+    'plays', 'man_hours', 'av_session_len', 'detected', 'is_new',
+    'is_hidden', 'is_workshop', 'played_recently', 'tags')
 
 
 # =============================================================================
 # >> FUNCTIONS
 # =============================================================================
-def time_fit(now, mins, maxs):
-    """Return True if `now` fits in the given minutes interval."""
-    if mins >= maxs:
-        return time_fit(now, mins, 24 * 60) or time_fit(now, 0, max)
+def get_rating(likes, dislikes, method):
+    if method == 1:
+        return likes
+
+    if method == 2:
+        return likes - dislikes
+
+    if method == 3:
+        if likes == 0:
+            return 0
+
+        # Let me divide it, hold my beer
+        if dislikes == 0:
+            return 1
+
+        return likes / (likes + dislikes)
+
+    if method == 4:
+        return get_wilson_score(likes, dislikes)
 
-    return mins <= now < maxs
+
+def get_wilson_score(likes, dislikes):
+    """Return the lower bound of the Wilson score interval of the likes.
+
+    Unlike the plain likes / (likes + dislikes), it's not enough to have
+    a single like to get to the top - the more ratings there are,
+    the closer it gets to the actual share of likes.
+    """
+    total = likes + dislikes
+    if total == 0:
+        return 0.0
+
+    share = likes / total
+    z2 = WILSON_Z ** 2
+    return (share + z2 / (2 * total) - WILSON_Z * sqrt(
+        (share * (1 - share) + z2 / (4 * total)) / total)) / (1 + z2 / total)
+
+
+def is_new_map(server_map, new_map_cutoff):
+    if new_map_cutoff is None:
+        return False
+
+    if not server_map.in_database:
+        return True
+
+    return server_map.detected > new_map_cutoff
 
 
 # =============================================================================
@@ -29,10 +102,216 @@ class ServerMapManager(dict):
 
         self.recent_map_names = []
 
+        # Sorted filenames of all maps, survives clear() so that we can
+        # tell if the rebuilt list is any different
+        self.map_names = ()
+        self.map_names_version = 0
+
+        # Maps that are not hidden by their time restrictions right now
+        self.playable_maps = set()
+
+        # Maps detected after this timestamp are new, None if disabled
+        self.new_map_cutoff = None
+
+        self._unrestricted_maps = frozenset()
+        self._restricted_maps = {}
+        self._boundaries = ()
+        self._sampler = None
+        self._sampler_key = None
+
+        # Player counts at which the set of eligible maps changes, and the
+        # eligible maps for every range between them
+        self._player_boundaries = ()
+        self._player_buckets = (frozenset(), )
+
+        # Playable and eligible maps, by player bucket. The version is
+        # bumped every time these are invalidated
+        self._vote_pools = {}
+        self.vote_pool_version = 0
+
+        # Every known tag gets its own bit in ServerMap.tag_mask
+        self._tag_bits = {}
+        self._tagged_maps = []
+
     def create(self, dict_):
         filename = dict_['filename'].lower()
-        self[filename] = ServerMap(dict_)
-        return self[filename]
+        server_map = self[filename] = ServerMap(dict_)
+
+        for tag in server_map.tags:
+            bit = self._tag_bits.setdefault(tag, len(self._tag_bits))
+            if bit == len(self._tagged_maps):
+                self._tagged_maps.append(set())
+
+            self._tagged_maps[bit].add(server_map)
+            server_map.tag_mask |= 1 << bit
+
+        return server_map
+
+    def clear(self):
+        self.stop_schedule()
+        self._tag_bits = {}
+        self._tagged_maps = []
+        self.playable_maps = set()
+        self._unrestricted_maps = frozenset()
+        self._restricted_maps = {}
+        self._boundaries = ()
+        self._sampler = None
+        self._player_boundaries = ()
+        self._player_buckets = (frozenset(), )
+        self._vote_pools = {}
+        self.vote_pool_version += 1
+
+        # Only keep bitmaps of the maps that are about to be created
+        clear_interned_bitmaps()
+
+        super().clear()
+
+    def refresh_map_names(self):
+        """Update the sorted tuple of map filenames.
+
+        Should be called every time the map list is rebuilt. Return True
+        if the list has changed since the last call.
+        """
+        map_names = tuple(sorted(self.keys()))
+        if map_names == self.map_names:
+            return False
+
+        self.map_names = map_names
+        self.map_names_version += 1
+        return True
+
+    def compile_schedule(self):
+        """Collect time restrictions of all maps into one schedule.
+
+        Should be called every time the map list is rebuilt.
+        """
+        restricted_maps = {}
+        unrestricted_maps = []
+        for server_map in self.values():
+            if server_map.time_restriction is None:
+                unrestricted_maps.append(server_map)
+            else:
+                restricted_maps.setdefault(
+                    server_map.time_restriction, []).append(server_map)
+
+        # Maps with identical schedules share the same bitmap, so we only
+        # need to look at every distinct bitmap once
+        boundaries = set()
+        for bitmap in restricted_maps:
+            boundaries.update(get_boundaries(bitmap))
+
+        self._unrestricted_maps = frozenset(unrestricted_maps)
+        self._restricted_maps = {
+            bitmap: tuple(server_maps)
+            for bitmap, server_maps in restricted_maps.items()}
+        self._boundaries = tuple(sorted(boundaries))
+
+        self.refresh_visibility()
+
+    def refresh_visibility(self):
+        """Rebuild the set of playable maps and wait for the next boundary.
+        """
+        self.stop_schedule()
+
+        now = datetime.now()
+        minute = get_minute_of_week(now)
+
+        playable_maps = set(self._unrestricted_maps)
+        for bitmap, server_maps in self._restricted_maps.items():
+            if is_set(bitmap, minute):
+                playable_maps.update(server_maps)
+
+        self.playable_maps = playable_maps
+        self._sampler = None
+        self._vote_pools = {}
+        self.vote_pool_version += 1
+
+        if not self._boundaries:
+            return
+
+        i = bisect_right(self._boundaries, minute)
+        if i < len(self._boundaries):
+            next_boundary = self._boundaries[i]
+        else:
+            next_boundary = self._boundaries[0] + MINUTES_PER_WEEK
+
+        seconds = ((next_boundary - minute) * 60 - now.second -
+                   now.microsecond / 1000000 + SCHEDULE_BOUNDARY_MARGIN)
+
+        scheduler.schedule('map_visibility', seconds, self.refresh_visibility)
+
+    def compile_player_buckets(self):
+        """Group maps by the player counts they can be played with.
+
+        Should be called every time the map list is rebuilt.
+        """
+        boundaries = set()
+        for server_map in self.values():
+            if server_map.min_players > 0:
+                boundaries.add(server_map.min_players)
+
+            if server_map.max_players is not None:
+                boundaries.add(server_map.max_players + 1)
+
+        self._player_boundaries = tuple(sorted(boundaries))
+
+        buckets = []
+        for players in (0, ) + self._player_boundaries:
+            buckets.append(frozenset(
+                server_map for server_map in self.values()
+                if server_map.is_eligible(players)))
+
+        self._player_buckets = tuple(buckets)
+        self._vote_pools = {}
+        self.vote_pool_version += 1
+
+    def get_player_bucket(self, players):
+        return bisect_right(self._player_boundaries, players)
+
+    def get_eligible_maps(self, players):
+        """Return the maps that can be played with the given player count.
+        """
+        return self._player_buckets[self.get_player_bucket(players)]
+
+    def get_vote_pool(self, players):
+        """Return the maps that can be put to the vote right now."""
+        bucket = self.get_player_bucket(players)
+        try:
+            return self._vote_pools[bucket]
+        except KeyError:
+            pool = self._vote_pools[bucket] = frozenset(
+                self.playable_maps & self._player_buckets[bucket])
+
+            return pool
+
+    def stop_schedule(self):
+        scheduler.cancel('map_visibility')
+
+    def refresh_new_map_cutoff(self):
+        old_cutoff = self.new_map_cutoff
+
+        days_cap = config_manager['new_map_timeout_days']
+        if days_cap < 0:
+            self.new_map_cutoff = None
+        else:
+            # A map stays new for the whole last day of days_cap
+            self.new_map_cutoff = (
+                int(time()) - (days_cap + 1) * SECONDS_PER_DAY)
+
+        # New maps are weighted differently, but the cutoff moves every
+        # second, so only drop the sampler if some map is new no more
+        # (or again)
+        if old_cutoff is None or self.new_map_cutoff is None:
+            if old_cutoff != self.new_map_cutoff:
+                self._sampler = None
+
+            return
+
+        low, high = sorted((old_cutoff, self.new_map_cutoff))
+        if any(low < server_map.detected <= high
+               for server_map in self.values()):
+
+            self._sampler = None
 
     def cap_recent_maps(self):
         self.recent_map_names = self.recent_map_names[
@@ -40,6 +319,206 @@ class ServerMapManager(dict):
             config_manager['recent_maps_limit']:
         ]
 
+        # Recently played maps are weighted differently
+        self._sampler = None
+
+    def _get_sampling_weights(self, server_maps):
+        rating_factor = config_manager['sampling_rating_factor']
+        new_factor = config_manager['sampling_new_factor']
+        recent_factor = config_manager['sampling_recent_factor']
+
+        # Ratings are normalized, so that every likemap_method gives
+        # the best map the same advantage
+        min_rating = rating_range = 0
+        if config_manager['likemap_enable'] and server_maps:
+            ratings = [server_map.rating for server_map in server_maps]
+            min_rating = min(ratings)
+            rating_range = max(ratings) - min_rating
+
+        for server_map in server_maps:
+            weight = 1.0
+            if rating_range:
+                weight += rating_factor * (
+                    server_map.rating - min_rating) / rating_range
+
+            if server_map.is_new:
+                weight *= new_factor
+
+            if server_map.played_recently:
+                weight *= recent_factor
+
+            yield weight * SAMPLING_WEIGHT_SCALE
+
+    def get_stats(self, server_maps, fields):
+        """Return a dict of lists with the given fields of the given maps.
+
+        Cvars and other shared state are only looked up once per call.
+        """
+        method = config_manager['likemap_method']
+        new_map_cutoff = self.new_map_cutoff
+        recent_map_names = set(self.recent_map_names)
+        playable_maps = self.playable_maps
+
+        getters = {
+            'name': lambda server_map: server_map.name,
+            'rating': lambda server_map: (
+                server_map.wilson_score if method == 4 else get_rating(
+                    server_map.likes, server_map.dislikes, method)),
+            'is_new': lambda server_map: is_new_map(
+                server_map, new_map_cutoff),
+            'is_hidden': lambda server_map: server_map not in playable_maps,
+            'is_workshop': lambda server_map: server_map.is_workshop,
+            'played_recently': lambda server_map: (
+                server_map.filename in recent_map_names),
+        }
+
+        result = {}
+        for field in fields:
+            if field in getters:
+                getter = getters[field]
+                result[field] = [getter(server_map)
+                                 for server_map in server_maps]
+            else:
+                result[field] = [getattr(server_map, field)
+                                 for server_map in server_maps]
+
+        return result
+
+    def filter_maps(self, new=None, hidden=None, recent=None):
+        """Yield the maps (sorted by filename) that match the filters.
+
+        Filters that are None are not applied.
+        """
+        new_map_cutoff = self.new_map_cutoff
+        recent_map_names = set(self.recent_map_names)
+
+        for map_name in self.map_names:
+            server_map = self[map_name]
+            if (new is not None and
+                    is_new_map(server_map, new_map_cutoff) != new):
+                continue
+
+            if (hidden is not None and
+                    (server_map not in self.playable_maps) != hidden):
+                continue
+
+            if (recent is not None and
+                    (server_map.filename in recent_map_names) != recent):
+                continue
+
+            yield server_map
+
+    def get_tag_mask(self, tags):
+        """Return the bitmask of the given tags, unknown tags are skipped."""
+        mask = 0
+        for tag in tags:
+            if tag in self._tag_bits:
+                mask |= 1 << self._tag_bits[tag]
+
+        return mask
+
+    def get_tagged_maps(self, mask):
+        """Return the set of maps that have any of the tags in the mask."""
+        result = set()
+        while mask:
+            lowest_bit = mask & -mask
+            result |= self._tagged_maps[lowest_bit.bit_length() - 1]
+            mask ^= lowest_bit
+
+        return result
+
+    def apply_group_quotas(self, server_maps, quotas, players):
+        """Swap maps in the vote until every group quota is met.
+
+        Missing maps are picked randomly among the vote pool maps that
+        weren't played recently. They replace the last maps that are neither
+        nominated nor belong to any of the groups.
+        """
+        quotas = [(self.get_tag_mask(tags), count) for tags, count in quotas]
+        quotas = [(mask, count) for mask, count in quotas if mask]
+
+        groups_mask = 0
+        for mask, count in quotas:
+            groups_mask |= mask
+
+        pool = self.get_vote_pool(players)
+        result = list(server_maps)
+        chosen_maps = set(result)
+        for mask, count in quotas:
+            missing = count - sum(
+                1 for server_map in result if server_map.tag_mask & mask)
+
+            if missing <= 0:
+                continue
+
+            candidates = [
+                server_map for server_map in self.get_tagged_maps(mask)
+                if (server_map in pool and
+                    server_map not in chosen_maps and
+                    not server_map.played_recently)
+            ]
+            shuffle(candidates)
+
+            for candidate in candidates[:missing]:
+                for i in reversed(range(len(result))):
+                    if (result[i].nominations == 0 and
+                            not result[i].tag_mask & groups_mask):
+                        break
+                else:
+                    # Nothing else can be replaced
+                    return result
+
+                chosen_maps.discard(result[i])
+                chosen_maps.add(candidate)
+                result[i] = candidate
+
+        return result
+
+    def sample_maps(self, number, players, nominated_maps=()):
+        """Pick the given number of vote pool maps for the vote.
+
+        Nominated maps always make it (most nominated first), the rest is
+        drawn randomly by their weights. Weights are only recalculated when
+        the vote pool, the new maps or the sampling cvars change.
+        """
+        pool = self.get_vote_pool(players)
+
+        # Weights also depend on these cvars, they may change at any time
+        sampler_key = (
+            self.get_player_bucket(players),
+            config_manager['sampling_rating_factor'],
+            config_manager['sampling_new_factor'],
+            config_manager['sampling_recent_factor'],
+            config_manager['likemap_enable'],
+            config_manager['likemap_method'],
+        )
+
+        if self._sampler is None or self._sampler_key != sampler_key:
+            server_maps = tuple(pool)
+            self._sampler = WeightedSampler(
+                server_maps, self._get_sampling_weights(server_maps))
+
+            self._sampler_key = sampler_key
+
+        result = sorted(
+            (server_map for server_map in set(nominated_maps)
+             if server_map in pool),
+            key=lambda server_map: server_map.nominations, reverse=True
+        )[:number]
+
+        result += self._sampler.sample(number - len(result), exclude=result)
+
+        # Maps with zero weight only fill the slots nobody else can take
+        if len(result) < number:
+            chosen_maps = set(result)
+            remaining_maps = [server_map for server_map in self._sampler.items
+                              if server_map not in chosen_maps]
+
+            shuffle(remaining_maps)
+            result += remaining_maps[:number - len(result)]
+
+        return result
+
 # The singleton object of the ServerMapManager class
 server_map_manager = ServerMapManager()
 
@@ -59,25 +538,44 @@ class ServerMap(BaseServerMap):
     def __init__(self, dict_):
         super().__init__()
 
-        self._minutes1 = None
-        self._minutes2 = None
+        # Minute-of-week bitmap, None if the map is not restricted
+        self.time_restriction = None
 
         self.filename = dict_['filename']
         self._fullname = dict_.get('fullname')
         self.detected = 0
-        self.likes = 0
-        self.dislikes = 0
+        self._likes = 0
+        self._dislikes = 0
+        self.wilson_score = 0.0
         self.man_hours = 0.0
         self.av_session_len = 0.0
+        self.plays = 0
         self.in_database = False
 
-        if 'timerestrict' in dict_:
-            restr1 , restr2 = dict_['timerestrict'].split(',')
-            hour1, minute1 = map(int, restr1.split(':'))
-            hour2, minute2 = map(int, restr2.split(':'))
+        self.min_players = int(dict_.get('min_players', 0))
+        max_players = dict_.get('max_players')
+        self.max_players = None if max_players is None else int(max_players)
+
+        # Maps without explicit tags are tagged with their prefix
+        tags = dict_.get('tags')
+        if tags is None:
+            sep_index = self.basename.find('_')
+            tags = (self.basename[:sep_index], ) if sep_index > 0 else ()
+
+        # A single string would be split into one-letter tags
+        elif (not isinstance(tags, (list, tuple)) or
+                not all(isinstance(tag, str) for tag in tags)):
+
+            raise ValueError("'tags' must be a list of strings")
 
-            self._minutes1 = hour1 * 60 + minute1
-            self._minutes2 = hour2 * 60 + minute2
+        self.tags = frozenset(tag.lower() for tag in tags)
+
+        # Filled in by ServerMapManager
+        self.tag_mask = 0
+
+        if 'timerestrict' in dict_:
+            self.time_restriction = compile_time_restriction(
+                dict_['timerestrict'])
 
     def _predict_fullname(self):
         basename = self.basename
@@ -119,13 +617,21 @@ class ServerMap(BaseServerMap):
         else:
             return self.basename
 
+    def is_eligible(self, players):
+        if players < self.min_players:
+            return False
+
+        return self.max_players is None or players <= self.max_players
+
     @property
     def played_recently(self):
         return self.filename in server_map_manager.recent_map_names
 
     @property
     def full_caption(self):
-        return popups_strings['caption_default'].tokenized(
+        return cached_tokenized(
+            popups_strings['caption_default'],
+
             prefix1=(popups_strings['prefix_recent'] if
                      self.played_recently else ""),
 
@@ -144,45 +650,39 @@ class ServerMap(BaseServerMap):
 
     @property
     def is_new(self):
-        days_cap = config_manager['new_map_timeout_days']
-        if days_cap < 0:
-            return False
+        return is_new_map(self, server_map_manager.new_map_cutoff)
 
-        if not self.in_database:
-            return True
+    @property
+    def is_hidden(self):
+        return self not in server_map_manager.playable_maps
 
-        detected_dt = datetime.fromtimestamp(self.detected)
-        now_dt = datetime.now()
+    @property
+    def likes(self):
+        return self._likes
 
-        return (now_dt - detected_dt).days <= days_cap
+    @likes.setter
+    def likes(self, value):
+        self._likes = value
+        self.wilson_score = get_wilson_score(self._likes, self._dislikes)
 
     @property
-    def is_hidden(self):
-        if self._minutes1 is None or self._minutes2 is None:
-            return False
+    def dislikes(self):
+        return self._dislikes
 
-        now = datetime.now()
-        now = now.hour * 60 + now.minute
-        return not time_fit(now, self._minutes1, self._minutes2)
+    @dislikes.setter
+    def dislikes(self, value):
+        self._dislikes = value
+        self.wilson_score = get_wilson_score(self._likes, self._dislikes)
 
     @property
     def rating(self):
         method = config_manager['likemap_method']
-        if method == 1:
-            return self.likes
-
-        if method == 2:
-            return self.likes - self.dislikes
-
-        if method == 3:
-            if self.likes == 0:
-                return 0
 
-            # Let me divide it, hold my beer
-            if self.dislikes == 0:
-                return 1
+        # Only changes together with likes and dislikes
+        if method == 4:
+            return self.wilson_score
 
-            return self.likes / (self.likes + self.dislikes)
+        return get_rating(self.likes, self.dislikes, method)
 
     @property
     def rating_str(self):
@@ -206,6 +706,9 @@ class ServerMap(BaseServerMap):
             return "{:.2f}".format(
                 self.likes / (self.likes + self.dislikes) * 100)
 
+        if config_manager['likemap_method'] == 4:
+            return "{:.1f}%".format(self.wilson_score * 100)
+
 
 class ExtendEntry(BaseServerMap):
     @property
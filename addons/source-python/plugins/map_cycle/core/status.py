@@ -31,9 +31,6 @@ class Status:
         # time() when current map started
         self.map_start_time = 0
 
-        # time() when current map should end, used by !timeleft command
-        self.map_end_time = 0
-
         # time() when last vote has started, used by keyhint_progress
         self.vote_start_time = 0
 
@@ -33,3 +33,34 @@ common_strings = LangStrings(info.name + "/strings")
 config_strings = LangStrings(info.name + "/config")
 map_names_strings = LangStrings(info.name + "/map_names")
 popups_strings = LangStrings(info.name + "/popups")
+
+_lang_strings_files = (
+    (common_strings, info.name + "/strings"),
+    (config_strings, info.name + "/config"),
+    (map_names_strings, info.name + "/map_names"),
+    (popups_strings, info.name + "/popups"),
+)
+
+
+# =============================================================================
+# >> FUNCTIONS
+# =============================================================================
+def reload_strings():
+    """Re-read translation files without replacing existing objects.
+
+    TranslationStrings instances are updated in place, so menus that
+    already reference them will pick up new texts.
+    """
+    for lang_strings, infile in _lang_strings_files:
+        new_lang_strings = LangStrings(infile)
+
+        for key in tuple(lang_strings.keys()):
+            if key not in new_lang_strings:
+                del lang_strings[key]
+
+        for key, translation_strings in new_lang_strings.items():
+            if key in lang_strings:
+                lang_strings[key].clear()
+                lang_strings[key].update(translation_strings)
+            else:
+                lang_strings[key] = translation_strings
@@ -0,0 +1,182 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+from datetime import datetime
+import re
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+FULL_WEEK = (1 << MINUTES_PER_WEEK) - 1
+
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+# Optional weekdays, then everything from the first digit on is the times
+WINDOW_PATTERN = re.compile(
+    r'^([a-z][a-z,\s-]*?)?\s*(\d.*)?$', re.IGNORECASE)
+
+# Identical schedules share the same bitmap object
+_interned_bitmaps = {}
+
+# Parsed 'timerestrict' values, so that the same spec is only compiled once
+_compiled_specs = {}
+
+
+# =============================================================================
+# >> CLASSES
+# =============================================================================
+class InvalidTimeRestriction(ValueError):
+    """Raised when 'timerestrict' value can't be parsed."""
+    pass
+
+
+# =============================================================================
+# >> FUNCTIONS
+# =============================================================================
+def get_minute_of_week(now=None):
+    if now is None:
+        now = datetime.now()
+
+    return now.weekday() * MINUTES_PER_DAY + now.hour * 60 + now.minute
+
+
+def is_set(bitmap, minute_of_week):
+    """Return True if the given minute is allowed by the bitmap."""
+    return (bitmap >> minute_of_week) & 1 == 1
+
+
+def _parse_time(time_str):
+    try:
+        hour, minute = map(int, time_str.strip().split(':'))
+    except ValueError:
+        raise InvalidTimeRestriction(
+            "Invalid time '{}', expected HH:MM".format(time_str))
+
+    if not (0 <= hour <= 24 and 0 <= minute < 60):
+        raise InvalidTimeRestriction("Time out of range: '{}'".format(
+            time_str))
+
+    return min(hour * 60 + minute, MINUTES_PER_DAY)
+
+
+def _parse_weekday(day_str):
+    try:
+        return WEEKDAYS.index(day_str.strip().lower()[:3])
+    except ValueError:
+        raise InvalidTimeRestriction("Unknown weekday '{}'".format(day_str))
+
+
+def _parse_days(days_str):
+    days = set()
+    for part in days_str.split(','):
+        if '-' in part:
+            first, last = map(_parse_weekday, part.split('-'))
+
+            # Ranges are allowed to wrap around the end of the week
+            day = first
+            days.add(day)
+            while day != last:
+                day = (day + 1) % 7
+                days.add(day)
+        else:
+            days.add(_parse_weekday(part))
+
+    return days
+
+
+def _window_bitmap(day, start, end):
+    """Return bitmap for a window that starts on the given day.
+
+    Overnight windows (start >= end) continue into the next day.
+    """
+    length = end - start
+    if length <= 0:
+        length += MINUTES_PER_DAY
+
+    start = (day * MINUTES_PER_DAY + start) % MINUTES_PER_WEEK
+    bitmap = ((1 << length) - 1) << start
+
+    # Sunday night windows end on Monday morning
+    return (bitmap | bitmap >> MINUTES_PER_WEEK) & FULL_WEEK
+
+
+def _compile_window(window):
+    match = WINDOW_PATTERN.match(window.strip())
+    try:
+        days_str, times_str = match.groups()
+        start_str, end_str = times_str.split(',')
+    except (AttributeError, ValueError):
+        raise InvalidTimeRestriction(
+            "Invalid window '{}', expected "
+            "'[<days>] HH:MM,HH:MM'".format(window))
+
+    start, end = _parse_time(start_str), _parse_time(end_str)
+    days = _parse_days(days_str) if days_str else range(7)
+
+    bitmap = 0
+    for day in days:
+        bitmap |= _window_bitmap(day, start, end)
+
+    return bitmap
+
+
+def intern_bitmap(bitmap):
+    return _interned_bitmaps.setdefault(bitmap, bitmap)
+
+
+def compile_time_restriction(spec):
+    """Compile 'timerestrict' value into a minute-of-week bitmap.
+
+    The value is either a single window or a list of windows. Each window
+    looks like "HH:MM,HH:MM", optionally prefixed with weekdays:
+    "sat,sun 22:00,06:00" or "mon-fri 18:00,23:00".
+
+    Return None if the map is allowed at any time of the week.
+    """
+    if isinstance(spec, str):
+        spec = (spec, )
+    elif isinstance(spec, list):
+        spec = tuple(spec)
+    else:
+        spec = None
+
+    if spec is None or not all(isinstance(window, str) for window in spec):
+        raise InvalidTimeRestriction(
+            "'timerestrict' must be a string or a list of strings")
+
+    try:
+        return _compiled_specs[spec]
+    except KeyError:
+        pass
+
+    bitmap = 0
+    for window in spec:
+        bitmap |= _compile_window(window)
+
+    if bitmap == FULL_WEEK:
+        bitmap = None
+    else:
+        bitmap = intern_bitmap(bitmap)
+
+    _compiled_specs[spec] = bitmap
+    return bitmap
+
+
+def get_boundaries(bitmap):
+    """Yield every minute of the week when the bitmap flips."""
+    # Bit N of the rotated bitmap is bit N-1 of the original one
+    rotated = ((bitmap << 1) | (bitmap >> (MINUTES_PER_WEEK - 1))) & FULL_WEEK
+    changes = bitmap ^ rotated
+    while changes:
+        lowest_bit = changes & -changes
+        yield lowest_bit.bit_length() - 1
+        changes ^= lowest_bit
+
+
+def clear_interned_bitmaps():
+    _interned_bitmaps.clear()
+    _compiled_specs.clear()
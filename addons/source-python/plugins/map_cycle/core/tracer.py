@@ -0,0 +1,108 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+from collections import deque
+import json
+from time import monotonic, time
+
+# Source.Python
+from loggers import LogManager
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+TRACE_BUFFER_SIZE = 8192
+
+# Lowest values of mc_logging_level that let the messages through
+LOGGING_LEVEL_DEBUG = 4
+LOGGING_LEVEL_INFO = 3
+LOGGING_LEVEL_WARNING = 2
+
+
+# =============================================================================
+# >> CLASSES
+# =============================================================================
+class TraceEvent:
+    """Log message that is only formatted when somebody reads it."""
+    __slots__ = ('timestamp', 'level', 'message', 'args')
+
+    def __init__(self, timestamp, level, message, args):
+        self.timestamp = timestamp
+        self.level = level
+        self.message = message
+        self.args = args
+
+    def __str__(self):
+        if not self.args:
+            return self.message
+
+        return self.message.format(*self.args)
+
+
+class Tracer:
+    """Ring buffer of the latest trace events."""
+    def __init__(self, max_events):
+        self.events = deque(maxlen=max_events)
+
+    def record(self, level, message, args):
+        event = TraceEvent(monotonic(), level, message, args)
+        self.events.append(event)
+        return event
+
+    def dump(self, events, path):
+        """Write the given events to the path as JSON lines."""
+        # Timestamps are monotonic, but wall time is easier to read
+        offset = time() - monotonic()
+        with open(path, 'w') as f:
+            for event in events:
+                f.write(json.dumps({
+                    'time': round(event.timestamp + offset, 6),
+                    'monotonic': round(event.timestamp, 6),
+                    'level': event.level,
+                    'message': str(event),
+                }) + '\n')
+
+    def clear(self):
+        self.events.clear()
+
+# The singleton object of the Tracer class
+tracer = Tracer(TRACE_BUFFER_SIZE)
+
+
+class TracingLogManager(LogManager):
+    """LogManager that also records messages in the trace buffer.
+
+    Messages use str.format() placeholders, arguments are passed
+    separately so that nothing is formatted unless it's logged or dumped.
+    """
+    def __init__(self, name, level, areas, *args, **kwargs):
+        super().__init__(name, level, areas, *args, **kwargs)
+        self._level_cvar = level
+
+    def _trace(self, level_name, level, message, args):
+        """Record the message, return its text if it's going to be logged.
+        """
+        event = tracer.record(level_name, message, args)
+        if self._level_cvar.get_int() < level:
+            return None
+
+        # LogManager passes the message to echo_console() and friends,
+        # they only accept str
+        return str(event)
+
+    def log_debug(self, message, *args, **kwargs):
+        text = self._trace('debug', LOGGING_LEVEL_DEBUG, message, args)
+        if text is not None:
+            super().log_debug(text, **kwargs)
+
+    def log_info(self, message, *args, **kwargs):
+        text = self._trace('info', LOGGING_LEVEL_INFO, message, args)
+        if text is not None:
+            super().log_info(text, **kwargs)
+
+    def log_warning(self, message, *args, **kwargs):
+        text = self._trace('warning', LOGGING_LEVEL_WARNING, message, args)
+        if text is not None:
+            super().log_warning(text, **kwargs)
@@ -3,16 +3,19 @@
 # =============================================================================
 # Python
 from colors import Color
+from heapq import nlargest
 from time import time
 
 # Source.Python
-from listeners.tick import Delay
+from filters.players import PlayerIter
 from messages import HintText, HudMsg
 
 # Map Cycle
 from .cvars import config_manager
 from .mcplayers import mcplayers
-from .server_maps import server_map_manager, whatever_entry
+from .profiler import profiler
+from .scheduler import scheduler
+from .server_maps import extend_entry, whatever_entry
 from .status import status
 from .strings import popups_strings
 
@@ -27,8 +30,9 @@ def format_map(server_map):
 # =============================================================================
 # >> GLOBAL VARIABLES
 # =============================================================================
-EXCLUDE_ENTRIES = (whatever_entry, )
+EXCLUDE_ENTRIES = (whatever_entry, extend_entry)
 REFRESH_INTERVAL = 2
+TOP_MAPS_NUMBER = 3
 HUDMSG_MSG_COLOR = Color(255, 255, 255)
 HUDMSG_MSG_X = -1
 HUDMSG_MSG_Y = 0.7
@@ -42,105 +46,119 @@ HUDMSG_MSG_CHANNEL = 3
 
 class VoteProgressBar:
     def __init__(self):
-        self._refresh_delay = None
-        self._message = None
+        self._last_state = None
+        self._voted_maps = set()
         self._players_total = 0
         self._players_voted = 0
 
+        # Reuse the same message objects for every update
+        self._hud_msg = HudMsg(
+            "",
+            color1=HUDMSG_MSG_COLOR,
+            x=HUDMSG_MSG_X,
+            y=HUDMSG_MSG_Y,
+            effect=HUDMSG_MSG_EFFECT,
+            fade_in=HUDMSG_MSG_FADEIN,
+            fade_out=HUDMSG_MSG_FADEOUT,
+            hold_time=HUDMSG_MSG_HOLDTIME,
+            fx_time=HUDMSG_MSG_FXTIME,
+            channel=HUDMSG_MSG_CHANNEL,
+        )
+        self._hint_text = HintText("")
+
+    @profiler.profile('VoteProgressBar.count_vote')
     def count_vote(self, map_):
         self._players_voted += 1
 
-        for exception in EXCLUDE_ENTRIES:
-            if map_ is exception:
-                return
-
-        maps = list(filter(lambda map_: map_.votes, sorted(
-            server_map_manager.values(),
-            key=lambda map_: map_.votes,
-            reverse=True
-        )))
-
-        map_tokens = {
-            'map1': popups_strings['vote_progress_map_without_votes'],
-            'map2': popups_strings['vote_progress_map_without_votes'],
-            'map3': popups_strings['vote_progress_map_without_votes'],
-        }
-        if len(maps) > 0:
-            map_tokens['map1'] = popups_strings[
-                'vote_progress_map_with_votes'].tokenized(
-                map=maps[0].name,
-                votes=maps[0].votes,
-            )
-            if len(maps) > 1:
-                map_tokens['map2'] = popups_strings[
+        if map_ not in EXCLUDE_ENTRIES:
+            self._voted_maps.add(map_)
+
+        # Several votes may come in during the same tick, only send
+        # the result once
+        if 'vote_progress_update' not in scheduler:
+            scheduler.schedule('vote_progress_update', 0, self.update)
+
+    def _get_recipients(self):
+        return tuple(
+            player.index for player in PlayerIter('human')
+            if mcplayers[player.index].voted_map is None
+        )
+
+    def update(self):
+        """Send the progress bar, but only if it has changed."""
+        if not config_manager['votemap_show_progress']:
+            return
+
+        time_left = max(0, int(status.vote_start_time +
+                               config_manager['vote_duration'] - time()))
+
+        maps = nlargest(
+            TOP_MAPS_NUMBER,
+            filter(lambda map_: map_.votes, self._voted_maps),
+            key=lambda map_: map_.votes
+        )
+
+        state = (
+            self._players_voted,
+            self._players_total,
+            time_left,
+            tuple((map_, map_.votes) for map_ in maps),
+        )
+        if state == self._last_state:
+            return
+
+        self._last_state = state
+
+        map_tokens = {}
+        for i in range(TOP_MAPS_NUMBER):
+            if i < len(maps):
+                map_tokens['map{}'.format(i + 1)] = popups_strings[
                     'vote_progress_map_with_votes'].tokenized(
-                    map=maps[1].name,
-                    votes=maps[1].votes,
+                    map=maps[i].name,
+                    votes=maps[i].votes,
                 )
-                if len(maps) > 2:
-                    map_tokens['map3'] = popups_strings[
-                        'vote_progress_map_with_votes'].tokenized(
-                        map=maps[2].name,
-                        votes=maps[2].votes,
-                    )
-
-        self._message = popups_strings['vote_progress'].tokenized(
+            else:
+                map_tokens['map{}'.format(i + 1)] = popups_strings[
+                    'vote_progress_map_without_votes']
+
+        message = popups_strings['vote_progress'].tokenized(
             players_voted=self._players_voted,
             players_total=self._players_total,
+            time_left="{:02d}:{:02d}".format(*divmod(time_left, 60)),
             **map_tokens,
         )
 
-        self.refresh()
+        if config_manager['votemap_progress_use_hudmsg']:
+            user_message = self._hud_msg
+        else:
+            user_message = self._hint_text
 
-    def refresh(self):
-        if self._refresh_delay is not None and self._refresh_delay.running:
-            self._refresh_delay.cancel()
+        user_message.message = message
 
-        if not config_manager['votemap_show_progress']:
-            return
+        if config_manager['votemap_progress_pending_only']:
+            recipients = self._get_recipients()
 
-        if self._message:
-            time_left = int(status.vote_start_time +
-                           config_manager['vote_duration'] - time())
-
-            message_tokenized = self._message.tokenized(
-                **self._message.tokens,
-                time_left="{:02d}:{:02d}".format(*divmod(time_left, 60)))
-
-            if config_manager['votemap_progress_use_hudmsg']:
-                HudMsg(
-                    message_tokenized,
-                    color1=HUDMSG_MSG_COLOR,
-                    x=HUDMSG_MSG_X,
-                    y=HUDMSG_MSG_Y,
-                    effect=HUDMSG_MSG_EFFECT,
-                    fade_in=HUDMSG_MSG_FADEIN,
-                    fade_out=HUDMSG_MSG_FADEOUT,
-                    hold_time=HUDMSG_MSG_HOLDTIME,
-                    fx_time=HUDMSG_MSG_FXTIME,
-                    channel=HUDMSG_MSG_CHANNEL,
-                ).send()
-            else:
-                HintText(message_tokenized).send()
+            # Sending to nobody would mean sending to everybody
+            if recipients:
+                user_message.send(*recipients)
 
-        self._refresh_delay = Delay(REFRESH_INTERVAL, self.refresh)
+        else:
+            user_message.send()
 
     def start(self):
         self._players_total = len(mcplayers)
         self._players_voted = 0
+        self._voted_maps.clear()
+        self._last_state = None
 
-        self._message = popups_strings['vote_progress'].tokenized(
-            players_voted=self._players_voted,
-            players_total=self._players_total,
-            map1=popups_strings['vote_progress_map_without_votes'],
-            map2=popups_strings['vote_progress_map_without_votes'],
-            map3=popups_strings['vote_progress_map_without_votes'],
-        )
-        self.refresh()
+        self.update()
+        scheduler.schedule(
+            'vote_progress_refresh', REFRESH_INTERVAL, self.update,
+            interval=REFRESH_INTERVAL)
 
     def stop(self):
-        if self._refresh_delay is not None and self._refresh_delay.running:
-            self._refresh_delay.cancel()
+        scheduler.cancel('vote_progress_refresh')
+        scheduler.cancel('vote_progress_update')
 
 # The singleton object of the VoteProgressBar class
 vote_progress_bar = VoteProgressBar()
@@ -0,0 +1,164 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+from array import array
+from random import choice
+
+# Map Cycle
+from .cvars import config_manager
+
+
+# =============================================================================
+# >> FUNCTIONS
+# =============================================================================
+def _get_leaders(counts):
+    """Return candidate IDs with the highest non-zero count."""
+    top = max(counts, default=0)
+    if top == 0:
+        return []
+
+    return [candidate_id for candidate_id, count in enumerate(counts)
+            if count == top]
+
+
+def get_voting_method():
+    return voting_methods[config_manager['votemap_method']]
+
+
+# =============================================================================
+# >> CLASSES
+# =============================================================================
+class BallotBox:
+    """Candidates of the current vote and their compact integer IDs.
+
+    Ballots are arrays of these IDs, most preferred candidate first.
+    """
+    def __init__(self):
+        self.candidates = ()
+        self._ids = {}
+
+    def reset(self, candidates):
+        self.candidates = tuple(candidates)
+        self._ids = {
+            candidate: candidate_id
+            for candidate_id, candidate in enumerate(self.candidates)}
+
+    def __contains__(self, candidate):
+        return candidate in self._ids
+
+    def __len__(self):
+        return len(self.candidates)
+
+    def get_id(self, candidate):
+        return self._ids[candidate]
+
+    @staticmethod
+    def new_ballot():
+        return array('H')
+
+# The singleton object of the BallotBox class
+ballot_box = BallotBox()
+
+
+class VotingMethod:
+    # Whether players are asked for more than one choice
+    multiple_choice = False
+
+    def tally(self, ballots, candidates_number):
+        """Return the list of winning candidate IDs.
+
+        More than one ID means a tie, an empty list means that nobody
+        has voted.
+        """
+        raise NotImplementedError
+
+
+class PluralityMethod(VotingMethod):
+    def tally(self, ballots, candidates_number):
+        counts = [0] * candidates_number
+        for ballot in ballots:
+            counts[ballot[0]] += 1
+
+        return _get_leaders(counts)
+
+
+class ApprovalMethod(VotingMethod):
+    multiple_choice = True
+
+    def tally(self, ballots, candidates_number):
+        counts = [0] * candidates_number
+        for ballot in ballots:
+            for candidate_id in set(ballot):
+                counts[candidate_id] += 1
+
+        return _get_leaders(counts)
+
+
+class InstantRunoffMethod(VotingMethod):
+    multiple_choice = True
+
+    def tally(self, ballots, candidates_number):
+        # Every ballot is only looked at when the candidate it currently
+        # counts towards gets eliminated
+        positions = [0] * len(ballots)
+        piles = [[] for i in range(candidates_number)]
+        for ballot_id, ballot in enumerate(ballots):
+            piles[ballot[0]].append(ballot_id)
+
+        eliminated = bytearray(candidates_number)
+        remaining = set(range(candidates_number))
+        active_ballots = len(ballots)
+
+        while active_ballots:
+            counts = {
+                candidate_id: len(piles[candidate_id])
+                for candidate_id in remaining}
+
+            top = max(counts.values())
+            if top * 2 > active_ballots:
+                return [candidate_id for candidate_id, count in counts.items()
+                        if count == top]
+
+            bottom = min(counts.values())
+            losers = [candidate_id for candidate_id, count in counts.items()
+                      if count == bottom]
+
+            # Everybody is tied, nobody to eliminate
+            if len(losers) == len(remaining):
+                return sorted(losers)
+
+            # Eliminating all of the tied candidates at once may knock out
+            # the one that would win with the others' transfers
+            loser = choice(losers)
+            eliminated[loser] = 1
+            remaining.remove(loser)
+
+            for ballot_id in piles[loser]:
+                ballot = ballots[ballot_id]
+                position = positions[ballot_id] + 1
+                while (position < len(ballot) and
+                       eliminated[ballot[position]]):
+
+                    position += 1
+
+                positions[ballot_id] = position
+                if position < len(ballot):
+                    piles[ballot[position]].append(ballot_id)
+                else:
+                    active_ballots -= 1
+
+            piles[loser] = []
+
+        return []
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+# Indexed by mc_votemap_method value
+voting_methods = {
+    1: PluralityMethod(),
+    2: ApprovalMethod(),
+    3: InstantRunoffMethod(),
+}
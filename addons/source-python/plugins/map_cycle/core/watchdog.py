@@ -0,0 +1,125 @@
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from threading import current_thread, main_thread
+from time import perf_counter
+
+# Map Cycle
+from .cvars import config_manager
+from .profiler import profiler
+
+
+# =============================================================================
+# >> FUNCTIONS
+# =============================================================================
+def format_trace(trace):
+    """Return a one-line summary of the traced sections.
+
+    Sections are recorded when they're left, so the children of every
+    section come right before it.
+    """
+    children = {}
+    for depth, section, duration in trace:
+        text = "{} {:.1f}ms".format(section, duration * 1000)
+
+        nested = children.pop(depth + 1, None)
+        if nested:
+            text += " ({})".format(", ".join(nested))
+
+        children.setdefault(depth, []).append(text)
+
+    return ", ".join(children.get(0, ())) or "no profiled sections"
+
+
+# =============================================================================
+# >> CLASSES
+# =============================================================================
+class Watchdog:
+    """Measure game callbacks against mc_tick_budget.
+
+    Callbacks that go over the budget are logged together with the
+    profiled sections they've entered. While the watchdog is enabled,
+    deferrable work that is started on the game thread is moved to a
+    background worker.
+    """
+    def __init__(self):
+        self._watching = False
+        self._executor = None
+
+    def entry_point(self, name):
+        """Decorate a game callback to measure it under the given name.
+
+        Nested entry points are measured as a part of the outer one.
+        """
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if self._watching or config_manager['tick_budget'] <= 0:
+                    return func(*args, **kwargs)
+
+                self._watching = True
+                profiler.start_trace()
+                start = perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    duration = perf_counter() - start
+                    trace = profiler.stop_trace()
+                    self._watching = False
+
+                    if duration * 1000 > config_manager['tick_budget']:
+                        self._report(name, duration, trace)
+
+            return wrapper
+
+        return decorator
+
+    def deferrable(self, func):
+        """Decorate a function that doesn't need to run on the game thread.
+
+        The original function is available as __wrapped__ for the cases
+        when it must finish before the caller continues.
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if (config_manager['tick_budget'] <= 0 or
+                    current_thread() is not main_thread()):
+
+                return func(*args, **kwargs)
+
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1)
+
+            self._executor.submit(self._run_deferred, func, args, kwargs)
+
+        return wrapper
+
+    def shutdown(self):
+        """Wait for all deferred work to finish."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    @staticmethod
+    def _report(name, duration, trace):
+        from ..map_cycle import logger
+
+        logger.log_warning(
+            "{} took {:.1f}ms (budget is {}ms): {}", name, duration * 1000,
+            config_manager['tick_budget'], format_trace(trace))
+
+    @staticmethod
+    def _run_deferred(func, args, kwargs):
+        from ..map_cycle import logger
+
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            logger.log_exception(
+                "Deferred {} has failed".format(func.__name__))
+
+# The singleton object of the Watchdog class
+watchdog = Watchdog()
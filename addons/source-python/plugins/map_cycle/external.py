@@ -1,7 +1,10 @@
 # =============================================================================
 # >> IMPORTS
 # =============================================================================
-from .core.server_maps import server_map_manager
+from .core.mcplayers import mcplayers
+from .core.notifications import (
+    OnMapListChanged, OnNextMapSet, OnVoteFinished, OnVoteStarted)
+from .core.server_maps import MAP_STAT_FIELDS, server_map_manager
 from .core.status import status, VoteStatus
 from .map_cycle import (
     change_level as _change_level, finish_vote, launch_likemap_survey,
@@ -17,10 +20,18 @@ __all__ = (
     'can_finish_vote',
     'finish_vote',
     'get_map_list',
+    'get_map_list_version',
+    'get_map_stats',
+    'find_maps',
+    'count_maps',
     'get_next_map',
     'set_next_map',
     'change_level',
-    'launch_likemap_survey'
+    'launch_likemap_survey',
+    'OnMapListChanged',
+    'OnNextMapSet',
+    'OnVoteFinished',
+    'OnVoteStarted',
 )
 
 
@@ -40,7 +51,55 @@ def can_finish_vote():
 
 
 def get_map_list():
-    return sorted(server_map_manager.keys())
+    """Return the sorted tuple of map filenames.
+
+    The same tuple is returned until the map list changes, compare
+    get_map_list_version() to find out if it did.
+    """
+    return server_map_manager.map_names
+
+
+def get_map_list_version():
+    return server_map_manager.map_names_version
+
+
+def get_map_stats(filenames=None, fields=MAP_STAT_FIELDS):
+    """Return a dict that maps every given field to a list of values.
+
+    Lists follow the order of the given filenames, or the order of
+    get_map_list() if no filenames are given.
+    """
+    for field in fields:
+        if field not in MAP_STAT_FIELDS:
+            raise ValueError("Unknown field: {}".format(field))
+
+    if filenames is None:
+        filenames = server_map_manager.map_names
+
+    server_maps = []
+    for map_name in filenames:
+        map_name = map_name.lower()
+        if map_name not in server_map_manager:
+            raise ValueError(
+                "Map {} was not found in Map Cycle".format(map_name))
+
+        server_maps.append(server_map_manager[map_name])
+
+    return server_map_manager.get_stats(server_maps, fields)
+
+
+def find_maps(new=None, hidden=None, recent=None):
+    """Return the sorted tuple of filenames that match the filters.
+
+    Every filter can be True, False or None (don't filter).
+    """
+    return tuple(server_map.filename for server_map in
+                 server_map_manager.filter_maps(new, hidden, recent))
+
+
+def count_maps(new=None, hidden=None, recent=None):
+    return sum(1 for server_map in
+               server_map_manager.filter_maps(new, hidden, recent))
 
 
 def get_next_map():
@@ -53,6 +112,12 @@ def set_next_map(map_name):
         raise ValueError("Map {} was not found in Map Cycle".format(map_name))
 
     server_map = server_map_manager[map_name]
+
+    players = len(mcplayers)
+    if server_map not in server_map_manager.get_eligible_maps(players):
+        raise ValueError("Map {} can't be played with {} players".format(
+            map_name, players))
+
     _set_next_map(server_map)
 
 
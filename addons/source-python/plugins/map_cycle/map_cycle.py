@@ -2,10 +2,11 @@
 # >> IMPORTS
 # =============================================================================
 # Python
+from collections import Counter
 from datetime import datetime
 import json
 from random import shuffle
-from time import time
+from time import perf_counter, time
 from warnings import warn
 
 # Source.Python
@@ -15,9 +16,8 @@ from cvars import ConVar
 from events import Event
 from engines.server import engine_server, global_vars
 from entities.entity import Entity
-from listeners import OnLevelInit, OnLevelShutdown
-from listeners.tick import Delay, GameThread
-from loggers import LogManager
+from listeners import OnLevelInit, OnLevelShutdown, OnTick
+from listeners.tick import GameThread
 from memory import get_virtual_function
 from memory.hooks import PreHook
 from menus import PagedMenu, PagedOption, SimpleOption, SimpleMenu, Text
@@ -33,17 +33,28 @@ from spam_proof_commands.server import ServerCommand
 from .core.cvars import (
     config_manager, cvar_logging_areas, cvar_logging_level,
     cvar_scheduled_vote_time, cvar_timelimit)
+from .core.journal import journal, JournalEntry
 from .core.mcplayers import broadcast, mcplayers, tell
-from .core.models import ServerMap as DB_ServerMap
-from .core.orm import Base, engine, Session
+from .core.message_dispatcher import message_dispatcher
+from .core.metrics import metrics
+from .core.notifications import (
+    on_map_list_changed_listener_manager, on_next_map_set_listener_manager,
+    on_vote_finished_listener_manager, on_vote_started_listener_manager)
 from .core.paths import (
     DEFAULT_MAPCYCLE_TXT_PATH, DOWNLOADLIST_PATH, MAPCYCLE_JSON_PATH,
     MAPCYCLE_TXT_PATH1, MAPCYCLE_TXT_PATH2)
+from .core.profiler import profiler
+from .core.recommendations import recommender
+from .core.scheduler import scheduler
 from .core.server_maps import extend_entry, server_map_manager, whatever_entry
 from .core.session_players import session_players
 from .core.status import status, VoteStatus
 from .core.strings import common_strings, popups_strings
+from .core.time_restrictions import InvalidTimeRestriction
+from .core.tracer import TracingLogManager
+from .core.voting_methods import ballot_box, get_voting_method
 from .core.vote_progress_bar import vote_progress_bar
+from .core.watchdog import watchdog
 from .core import mc_commands
 from .info import info
 
@@ -53,18 +64,47 @@ from .info import info
 # =============================================================================
 def init_popups():
     @nomination_popup.register_select_callback
+    @watchdog.entry_point('nomination_popup')
     def select_callback(popup, index, option):
         mcplayers[index].nominate_callback(option.value)
 
+    @nomination_popup.register_build_callback
+    def build_callback(popup, index):
+        update_nomination_popup()
+
     @likemap_popup.register_select_callback
+    @watchdog.entry_point('likemap_popup')
     def select_callback(popup, index, option):
         mcplayers[index].likemap_callback(option.value)
 
     @main_popup.register_select_callback
+    @watchdog.entry_point('main_popup')
     def select_callback(popup, index, option):
-        option.value.votes += 1
-        vote_progress_bar.count_vote(option.value)
-        mcplayers[index].vote_callback(option.value)
+        mcplayer = mcplayers[index]
+        mcplayer.vote_callback(option.value)
+
+        # Multiple-choice ballots are collected through successive picks
+        if (status.vote_status == VoteStatus.IN_PROGRESS and
+                mcplayer.voted_map is not None and
+                not mcplayer.ballot_complete):
+
+            return popup
+
+    @main_popup.register_build_callback
+    def build_callback(popup, index):
+
+        # Title is only used for rendering, so it's safe to change it for
+        # every player
+        choices_made = len(mcplayers[index].get_pending_choices())
+        if choices_made:
+            popup.title = popups_strings['choose_map_choice'].tokenized(
+                choice=choices_made + 1)
+        else:
+            popup.title = popups_strings['choose_map']
+
+    @main_popup.register_close_callback
+    def close_callback(popup, index):
+        mcplayers[index].complete_ballot()
 
     likemap_popup.append(Text(popups_strings['rate_map']))
 
@@ -138,7 +178,11 @@ def build_json_from_mapcycle_txt():
         json.dump(rs, f, indent=4)
 
 
+@profiler.profile('load_maps_from_db')
 def load_maps_from_db():
+    from .core.models import ServerMap as DB_ServerMap
+    from .core.orm import Session
+
     session = Session()
 
     for db_server_map in session.query(DB_ServerMap).all():
@@ -150,13 +194,25 @@ def load_maps_from_db():
         map_.detected = db_server_map.detected
         map_.likes = db_server_map.likes
         map_.dislikes = db_server_map.dislikes
+        map_.man_hours = db_server_map.man_hours or 0.0
+        map_.av_session_len = db_server_map.av_session_len or 0.0
+        map_.plays = db_server_map.plays or 0
 
     session.close()
 
 
+@watchdog.deferrable
+@profiler.profile('save_maps_to_db')
 def save_maps_to_db():
+    from .core.models import ServerMap as DB_ServerMap
+    from .core.orm import Session
+
+    start_time = perf_counter()
     detected = int(time())
 
+    # Only the journal records that are already counted in the maps can go
+    checkpoint = journal.get_checkpoint()
+
     session = Session()
     for server_map in list(server_map_manager.values()):
         db_server_map = session.query(DB_ServerMap).filter_by(
@@ -174,13 +230,30 @@ def save_maps_to_db():
 
         db_server_map.likes = server_map.likes
         db_server_map.dislikes = server_map.dislikes
+        db_server_map.wilson_score = server_map.wilson_score
         db_server_map.man_hours = server_map.man_hours
         db_server_map.av_session_len = server_map.av_session_len
+        db_server_map.plays = server_map.plays
 
     session.commit()
     session.close()
 
+    journal.drop(checkpoint)
 
+    recommender.save()
+
+    metrics.db_flushed(perf_counter() - start_time)
+
+
+def update_database(learn=False):
+    save_maps_to_db()
+
+    # Only now the ratings of the last level are in the database
+    if learn:
+        recommender.fit()
+
+
+@profiler.profile('reload_map_list')
 def reload_map_list():
     if not isinstance(mapcycle_json, list):
         raise CorruptJSONFile("Parsed object is not a list")
@@ -207,9 +280,28 @@ def reload_map_list():
             warn("Engine says that '' is not a valid map".format(filename))
             continue
 
-        server_map_manager.create(json_dict)
+        try:
+            server_map_manager.create(json_dict)
+        except (InvalidTimeRestriction, ValueError) as e:
+            warn("Map '{}': {}".format(filename, e))
+            continue
+
+    # Find out which maps are playable now and when that changes
+    server_map_manager.compile_schedule()
 
-    logger.log_debug("Added {} valid maps".format(len(server_map_manager)))
+    # Sort maps by the player counts they can be played with
+    server_map_manager.compile_player_buckets()
+
+    # Decide which maps are new for the upcoming level
+    server_map_manager.refresh_new_map_cutoff()
+
+    logger.log_debug("Added {} valid maps", len(server_map_manager))
+
+    # Let other plugins know if they need to refetch the map list
+    if server_map_manager.refresh_map_names():
+        on_map_list_changed_listener_manager.notify(
+            server_map_manager.map_names,
+            server_map_manager.map_names_version)
 
     # Now rebuild nomination menu
     nomination_popup.clear()
@@ -225,10 +317,33 @@ def reload_map_list():
             selectable=selectable
         ))
 
-    logger.log_debug("Added {} maps to the !nominate menu".format(
-        len(server_map_manager.values())))
+    # Eligible maps will be picked when the menu is first shown
+    global nomination_popup_bucket
+    nomination_popup_bucket = None
+
+    logger.log_debug(
+        "Added {} maps to the !nominate menu",
+        len(server_map_manager.values()))
+
+
+def update_nomination_popup():
+    """Only let players nominate maps that fit the current player count."""
+    global nomination_popup_bucket
+    bucket = server_map_manager.get_player_bucket(len(mcplayers))
+    if bucket == nomination_popup_bucket:
+        return
+
+    nomination_popup_bucket = bucket
+
+    eligible_maps = server_map_manager.get_eligible_maps(len(mcplayers))
+    for option in nomination_popup:
+        selectable = (not option.value.played_recently and
+                      option.value in eligible_maps)
 
+        option.highlight = option.selectable = selectable
 
+
+@profiler.profile('reload_maps_from_mapcycle')
 def reload_maps_from_mapcycle():
     # Load JSON
     try:
@@ -255,30 +370,22 @@ def reload_maps_from_mapcycle():
     load_maps_from_db()
 
 
-def launch_vote(scheduled=False):
-    if status.vote_status != VoteStatus.NOT_STARTED:
-        return      # TODO: Maybe put a warning or an exception here?
-
-    logger.log_debug("Launching the vote (scheduled={})".format(scheduled))
-
-    status.vote_status = VoteStatus.IN_PROGRESS
-    status.vote_start_time = time()
+def get_vote_key(scheduled):
+    """Return everything that build_vote_options() results depend on."""
+    return (
+        scheduled,
+        frozenset(Counter(mcplayers.get_nominated_maps()).items()),
+        server_map_manager.get_player_bucket(len(mcplayers)),
+        server_map_manager.vote_pool_version,
+    )
 
-    # Cancel any scheduled votes in case somebody called us directly
-    if delay_scheduled_vote is not None and delay_scheduled_vote.running:
-        delay_scheduled_vote.cancel()
 
-    global delay_end_vote   # We will assign to this later
-    if delay_end_vote is not None and delay_end_vote.running:
-        delay_end_vote.cancel()
-
-    # Cancel likemap survey
-    if delay_likemap_survey is not None and delay_likemap_survey.running:
-        delay_likemap_survey.cancel()
-
-    # And unsend that popup from all players
-    likemap_popup.close()
+@profiler.profile('build_vote_options')
+def build_vote_options(scheduled):
+    """Pick the maps for the vote and return the options of its popup.
 
+    Return None if there are no maps to pick from.
+    """
     # Reset maps
     whatever_entry.votes = 0
     extend_entry.votes = 0
@@ -286,14 +393,13 @@ def launch_vote(scheduled=False):
         server_map.votes = 0
         server_map.nominations = 0
 
-    # Create new popup
-    main_popup.clear()
+    options = []
 
     # First of all, add "I Don't Care" option if it's enabled
     if config_manager['votemap_whatever_option']:
 
         # Add to the list
-        main_popup.append(PagedOption(
+        options.append(PagedOption(
             text=whatever_entry.name,
             value=whatever_entry,
         ))
@@ -305,7 +411,7 @@ def launch_vote(scheduled=False):
         selectable = status.can_extend()
 
         # Add to the list
-        main_popup.append(PagedOption(
+        options.append(PagedOption(
             text=extend_entry.name,
             value=extend_entry,
             highlight=selectable,
@@ -314,20 +420,26 @@ def launch_vote(scheduled=False):
 
     # Now to the actual maps
     # Count nominations
+    nominated_maps = []
     for nominated_map in mcplayers.get_nominated_maps():
         nominated_map.nominations += 1
+        nominated_maps.append(nominated_map)
 
-    mcplayers.reset_nominated_maps()
+    # new_map_timeout_days might've changed since the level start
+    server_map_manager.refresh_new_map_cutoff()
 
-    server_maps = server_map_manager.values()
+    # Only take maps that are not hidden
+    if (config_manager['weighted_sampling_enable'] and
+            config_manager['votemap_max_options'] > 0):
 
-    # Filter hidden maps out
-    server_maps = list(filter(
-        lambda server_map: not server_map.is_hidden, server_maps))
+        server_maps = server_map_manager.sample_maps(
+            config_manager['votemap_max_options'], len(mcplayers),
+            nominated_maps)
+    else:
+        server_maps = list(server_map_manager.get_vote_pool(len(mcplayers)))
 
     if not server_maps:
-        warn("Please add more maps to the server or reconfigure Map Cycle")
-        return
+        return None
 
     # Do we need to do an initial alphabetic sort?
     if config_manager['alphabetic_sort_enable']:
@@ -345,12 +457,23 @@ def launch_vote(scheduled=False):
         # Shuffle
         shuffle(server_maps)
 
-    # Now sort by rating (likes, likes - dislikes or likes:dislikes)
+    # Now sort by rating (likes, likes - dislikes, likes:dislikes or
+    # Wilson score)
     if config_manager['likemap_enable']:
         server_maps = sorted(
             server_maps,
             key=lambda server_map: server_map.rating, reverse=True)
 
+    # Now sort by what the players online are predicted to like
+    if config_manager['recommendations_enable']:
+        scores = recommender.get_scores(mcplayers.get_human_steamids())
+        if scores is not None:
+            server_maps = sorted(
+                server_maps,
+                key=lambda server_map: scores.get(
+                    server_map.filename.lower(), 0.0),
+                reverse=True)
+
     # Now separate new and old maps
     server_maps = sorted(
         server_maps, key=lambda server_map: server_map.is_new, reverse=True)
@@ -368,29 +491,100 @@ def launch_vote(scheduled=False):
     if config_manager['votemap_max_options'] > 0:
         server_maps = server_maps[:config_manager['votemap_max_options']]
 
+        # Make sure that every map group gets its share
+        server_maps = server_map_manager.apply_group_quotas(
+            server_maps, config_manager['vote_group_quotas'], len(mcplayers))
+
     # Fill popup with the maps
     for server_map in server_maps:
 
         # Add the map to the popup
         selectable = not server_map.played_recently
-        main_popup.append(PagedOption(
+        options.append(PagedOption(
             text=server_map.full_caption,
             value=server_map,
             highlight=selectable,
             selectable=selectable
         ))
 
-    logger.log_debug("Added {} maps to the vote".format(len(server_maps)))
+    logger.log_debug("Added {} maps to the vote", len(server_maps))
+
+    return options
 
-    # Send popup to players
-    for mcplayer in mcplayers.values():
-        if mcplayer.is_bot():
-            continue
 
-        mcplayer.send_popup(main_popup)
+def prepare_vote():
+    """Build the options of the upcoming scheduled vote in advance.
+
+    launch_vote() will use them as long as nobody has nominated a map and
+    the set of maps to pick from has stayed the same.
+    """
+    if status.vote_status != VoteStatus.NOT_STARTED:
+        return
+
+    global prepared_vote
+    prepared_vote = (get_vote_key(True), build_vote_options(True))
+
+    logger.log_debug("Prepared the scheduled vote")
+
+
+@watchdog.entry_point('launch_vote')
+@profiler.profile('launch_vote')
+def launch_vote(scheduled=False):
+    if status.vote_status != VoteStatus.NOT_STARTED:
+        return      # TODO: Maybe put a warning or an exception here?
+
+    logger.log_debug("Launching the vote (scheduled={})", scheduled)
+
+    status.vote_status = VoteStatus.IN_PROGRESS
+    status.vote_start_time = time()
+
+    metrics.vote_started()
+
+    # Cancel any scheduled votes in case somebody called us directly
+    scheduler.cancel('prepare_vote')
+    scheduler.cancel('scheduled_vote')
+    scheduler.cancel('end_vote')
+
+    # Cancel likemap survey
+    scheduler.cancel('likemap_survey')
+
+    # And unsend that popup from all players
+    likemap_popup.close()
+
+    # Reuse the options prepared in advance if they're still valid
+    vote_key = get_vote_key(scheduled)
+
+    global prepared_vote
+    if prepared_vote is not None and prepared_vote[0] == vote_key:
+        logger.log_debug("Using the prepared vote")
+
+        options = prepared_vote[1]
+    else:
+        options = build_vote_options(scheduled)
+
+    prepared_vote = None
+
+    mcplayers.reset_nominated_maps()
+
+    if options is None:
+        warn("Please add more maps to the server or reconfigure Map Cycle")
+        return
+
+    # Create new popup
+    main_popup.clear()
+    main_popup.extend(options)
+
+    # Only selectable options can make it to the ballots
+    ballot_box.reset(
+        option.value for option in main_popup
+        if option.selectable and option.value is not whatever_entry)
+
+    # Send popup to players
+    message_dispatcher.send_popup(main_popup, mcplayers.get_human_indexes())
 
     # Define vote end
-    delay_end_vote = Delay(config_manager['vote_duration'], finish_vote)
+    scheduler.schedule(
+        'end_vote', config_manager['vote_duration'], finish_vote)
 
     # Start KeyHintProgress
     vote_progress_bar.start()
@@ -402,7 +596,13 @@ def launch_vote(scheduled=False):
     # ... chat message
     broadcast(common_strings['vote_started'])
 
+    on_vote_started_listener_manager.notify(tuple(
+        option.value.filename for option in options
+        if option.value not in (whatever_entry, extend_entry)))
+
 
+@watchdog.entry_point('finish_vote')
+@profiler.profile('finish_vote')
 def finish_vote():
     if status.vote_status != VoteStatus.IN_PROGRESS:
         return      # TODO: Same, warning/exception may fit better here?
@@ -411,9 +611,8 @@ def finish_vote():
 
     status.vote_status = VoteStatus.ENDED
 
-    # Delay might still be running if the vote finished prematurely
-    if delay_end_vote is not None and delay_end_vote.running:
-        delay_end_vote.cancel()
+    # Timer might still be running if the vote finished prematurely
+    scheduler.cancel('end_vote')
 
     main_popup.close()
 
@@ -428,40 +627,57 @@ def finish_vote():
     for server_map in mcplayers.get_voted_maps():
         server_map.votes += 1
 
+    if config_manager['recommendations_enable']:
+        for mcplayer in mcplayers.values():
+            if (mcplayer.is_bot() or
+                    mcplayer.voted_map in (None, whatever_entry,
+                                           extend_entry)):
+                continue
+
+            recommender.record_vote(
+                mcplayer.session_player.steamid, mcplayer.voted_map.filename)
+
+    ballots = list(mcplayers.get_ballots())
+
+    metrics.vote_finished(time() - status.vote_start_time, len(ballots))
+
     mcplayers.reset_voted_maps()
 
-    server_maps = server_map_manager.values()
-    server_maps = filter(
-        lambda server_map: not server_map.is_hidden, server_maps)
+    voting_method = get_voting_method()
+    result_maps = []
+    for candidate_id in voting_method.tally(ballots, len(ballot_box)):
+        candidate = ballot_box.candidates[candidate_id]
+        if candidate is extend_entry:
+            if status.can_extend():
+                result_maps.append(candidate)
 
-    if status.can_extend():
-        candidate_maps = tuple(server_maps) + (extend_entry, )
-    else:
-        candidate_maps = server_maps
+        elif not candidate.is_hidden:
+            result_maps.append(candidate)
 
-    candidate_maps = sorted(
-        candidate_maps, key=lambda server_map: server_map.votes, reverse=True)
+    logger.log_debug(
+        "{} ballots counted by {}, {} map(s) won",
+        len(ballots), type(voting_method).__name__, len(result_maps))
+
+    # If nobody voted, any map can win
+    if not result_maps:
+        result_maps = list(server_map_manager.get_vote_pool(len(mcplayers)))
+
+        if status.can_extend():
+            result_maps.append(extend_entry)
 
-    if not candidate_maps:
+    if not result_maps:
 
         # If there're no maps on the server, there's not much we can do
         logger.log_debug("No maps to choose from in finish_vote()!")
 
         broadcast(common_strings['no_choice'])
 
-        if delay_changelevel and delay_changelevel.running:
-            logger.log_debug("Cancelling change_level...")
-
-            delay_changelevel.cancel()
+        if scheduler.cancel('change_level'):
+            logger.log_debug("Cancelled change_level")
 
+        on_vote_finished_listener_manager.notify(None)
         return
 
-    # Leave only maps with max votes number
-    result_maps = []
-    for server_map in candidate_maps:
-        if server_map.votes == candidate_maps[0].votes:
-            result_maps.append(server_map)
-
     # If you ever want to implement VIP/Premium features into
     # !rtv and keep it fair, here's the place:
     shuffle(result_maps)
@@ -478,7 +694,7 @@ def finish_vote():
             time=config_manager['extend_time']))
 
     else:
-        logger.log_debug("Winner map: {}".format(winner_map.filename))
+        logger.log_debug("Winner map: {}", winner_map.filename)
 
         broadcast(common_strings['map_won'].tokenized(map=winner_map.name))
 
@@ -486,6 +702,9 @@ def finish_vote():
     if config_manager['sound_vote_end'] is not None:
         config_manager['sound_vote_end'].play()
 
+    on_vote_finished_listener_manager.notify(
+        None if winner_map is extend_entry else winner_map.filename)
+
 
 def set_next_map(server_map):
 
@@ -499,25 +718,22 @@ def set_next_map(server_map):
         # Reset RTV for each user
         mcplayers.reset_rtv()
 
-        # Cancel and relaunch delay_changelevel...
-        global delay_changelevel
-        if delay_changelevel is not None and delay_changelevel.running:
-            delay_changelevel.cancel()
-
+        # Reschedule change_level and a new vote, they might not be
+        # needed anymore if mc_timelimit was set to 0
+        scheduler.cancel('change_level')
         schedule_change_level(was_extended=True)
 
-        # ... and then cancel and schedule a new vote
-        if delay_scheduled_vote is not None and delay_scheduled_vote.running:
-            delay_scheduled_vote.cancel()
-
+        scheduler.cancel('scheduled_vote')
         schedule_vote(was_extended=True)
         return
 
-    logger.log_debug("Setting next map to {}...".format(server_map.filename))
+    logger.log_debug("Setting next map to {}...", server_map.filename)
 
     # If we don't need to extend current map, set a new next map
     status.next_map = server_map
 
+    on_next_map_set_listener_manager.notify(server_map.filename)
+
 
 def schedule_change_level(was_extended=False):
 
@@ -527,20 +743,16 @@ def schedule_change_level(was_extended=False):
         # If not, no reason to continue
         return
 
-    logger.log_debug(
-        "Scheduling change_level (was_extended={})".format(was_extended))
+    logger.log_debug("Scheduling change_level (was_extended={})", was_extended)
 
     if was_extended:
         seconds = config_manager['extend_time'] * 60 + EXTRA_SECONDS_AFTER_VOTE
     else:
         seconds = config_manager['timelimit'] * 60 + EXTRA_SECONDS_AFTER_VOTE
 
-    global delay_changelevel
-    delay_changelevel = Delay(seconds, change_level)
-
-    status.map_end_time = time() + seconds
+    scheduler.schedule('change_level', seconds, change_level)
 
-    logger.log_debug("We will end the game in {} seconds.".format(seconds))
+    logger.log_debug("We will end the game in {} seconds.", seconds)
 
 
 def schedule_vote(was_extended=False):
@@ -551,8 +763,7 @@ def schedule_vote(was_extended=False):
         # If not, no reason to continue
         return
 
-    logger.log_debug(
-        "Scheduling the vote (was_extended={})".format(was_extended))
+    logger.log_debug("Scheduling the vote (was_extended={})", was_extended)
 
     # We need to decide if we schedule vote from round start or
     # from map extension
@@ -602,21 +813,23 @@ def schedule_vote(was_extended=False):
                    config_manager['vote_duration'])
 
     # Schedule the vote
-    global delay_scheduled_vote
-    delay_scheduled_vote = Delay(seconds, launch_vote, args=(True, ))
+    scheduler.schedule('scheduled_vote', seconds, launch_vote, args=(True, ))
+
+    logger.log_debug("Scheduled vote starts in {} seconds", seconds)
 
-    logger.log_debug("Scheduled vote starts in {} seconds".format(seconds))
+    # Prepare the vote while players are busy with the likemap survey
+    scheduler.schedule(
+        'prepare_vote', max(0, seconds - VOTE_PREPARE_ADVANCE), prepare_vote)
 
     # Schedule likemap survey
     if config_manager['likemap_survey_duration'] > 0:
         seconds = max(0, seconds - config_manager['likemap_survey_duration'])
-        global delay_likemap_survey
-        delay_likemap_survey = Delay(seconds, launch_likemap_survey)
+        scheduler.schedule('likemap_survey', seconds, launch_likemap_survey)
 
-        logger.log_debug(
-            "Scheduled likemap survey in {} seconds".format(seconds))
+        logger.log_debug("Scheduled likemap survey in {} seconds", seconds)
 
 
+@watchdog.entry_point('change_level')
 def change_level(round_end=False):
     if status.next_map is None:
         raise RuntimeError("It's already time to change the level, "
@@ -642,7 +855,7 @@ def check_if_enough_votes():
         if mcplayer.is_bot():
             continue
 
-        if mcplayer.voted_map is None:
+        if not mcplayer.ballot_complete:
             return
 
     finish_vote()
@@ -656,30 +869,23 @@ def check_if_enough_rtv():
 
     if ratio >= config_manager['rtv_needed']:
 
-        # Cancel change_level delay if any
-        global delay_changelevel
-        if delay_changelevel is not None and delay_changelevel.running:
-            delay_changelevel.cancel()
-
-        # Relaunch change_level delay
+        # Change the level right after the vote
         seconds = config_manager['vote_duration'] + EXTRA_SECONDS_AFTER_VOTE
-        delay_changelevel = Delay(seconds, change_level)
+        scheduler.schedule('change_level', seconds, change_level)
 
+        metrics.rtv_votes += 1
         launch_vote(scheduled=False)
 
 
+@watchdog.entry_point('launch_likemap_survey')
 def launch_likemap_survey():
     logger.log_debug("Launching mass likemap survey")
 
-    for mcplayer in mcplayers.values():
-        if mcplayer.is_bot():
-            continue
-
-        reason = mcplayer.get_likemap_denial_reason()
-        if reason is not None:
-            continue
-
-        mcplayer.send_popup(likemap_popup)
+    message_dispatcher.send_popup(likemap_popup, tuple(
+        index for index, mcplayer in mcplayers.items()
+        if not mcplayer.is_bot() and
+        mcplayer.get_likemap_denial_reason() is None
+    ))
 
 
 # =============================================================================
@@ -709,6 +915,9 @@ NEGATIVE_TIMELIMIT_FALLBACK_VALUE = 60.0
 # Take a look at schedule_vote()
 INVALID_SCHEDULED_VOTE_TIME_FALLBACK_VALUE = 0.33
 
+# How many seconds before the scheduled vote to prepare its popup
+VOTE_PREPARE_ADVANCE = 3
+
 # We will add extra seconds after vote ends to prevent
 # instant level changing when the vote ends
 EXTRA_SECONDS_AFTER_VOTE = 5.0
@@ -732,18 +941,19 @@ with open(DOWNLOADLIST_PATH) as f:
 # Save original mp_timelimit value
 mp_timelimit_old_value = 0
 
-logger = LogManager(info.name, cvar_logging_level, cvar_logging_areas)
+logger = TracingLogManager(
+    info.name, cvar_logging_level, cvar_logging_areas)
 
 mapcycle_json = None
 
-# Delays
-delay_scheduled_vote = None
-delay_changelevel = None
-delay_end_vote = None
-delay_likemap_survey = None
-
 # Popups
 nomination_popup = PagedMenu(title=popups_strings['nominate_map'])
+
+# Player bucket that nomination_popup options were last updated for
+nomination_popup_bucket = None
+
+# (vote key, popup options) of the upcoming scheduled vote
+prepared_vote = None
 likemap_popup = SimpleMenu()
 main_popup = PagedMenu(title=popups_strings['choose_map'])
 
@@ -759,18 +969,16 @@ class CorruptJSONFile(Exception):
     pass
 
 
-# =============================================================================
-# >> SYNCHRONOUS DATABASE OPERATIONS
-# =============================================================================
-Base.metadata.create_all(engine)
-
-
 # =============================================================================
 # >> LOAD & UNLOAD FUNCTIONS
 # =============================================================================
 def load():
     logger.log_debug("Entered load()...")
 
+    # Restore statistics that didn't make it into the database last time
+    journal.replay()
+    journal.start()
+
     reload_maps_from_mapcycle()
 
     logger.log_debug("Reloaded map list from JSON")
@@ -785,7 +993,7 @@ def load():
 
         logger.log_debug(
             "mc_timelimit was -1, set to the value of mp_timelimit "
-            "(mp_timelimit = {})".format(mp_timelimit_old_value))
+            "(mp_timelimit = {})", mp_timelimit_old_value)
 
     if mp_timelimit_old_value < 0:
         warn("mp_timelimit is negative, can't grab value from it")
@@ -799,20 +1007,20 @@ def load():
     if global_vars.map_name:
         map_name = global_vars.map_name
         server_map_manager.recent_map_names.append(global_vars.map_name)
-        logger.log_debug("Current level name is {}".format(map_name))
+        logger.log_debug("Current level name is {}", map_name)
 
         status.current_map = server_map_manager.get(map_name)
 
         if status.current_map is None:
-            logger.log_debug("Current map '{}' is not "
-                          "from mapcycle.json!".format(map_name))
+            logger.log_debug(
+                "Current map '{}' is not "
+                "from mapcycle.json!", map_name)
 
         # We think that the level is loaded with us
         status.map_start_time = time()
-        logger.log_debug("Level start time: {}".format(
-            datetime.fromtimestamp(
-                status.map_start_time
-            ).strftime('%X')))
+        logger.log_debug(
+            "Level start time: {:%X}",
+            datetime.fromtimestamp(status.map_start_time))
 
         # Schedule the vote, it will be scheduled as if the map is loaded
         # with us
@@ -825,6 +1033,9 @@ def load():
     # Init popups
     init_popups()
 
+    # Start writing metrics
+    metrics.start()
+
     # ... chat message
     broadcast(common_strings['loaded'])
 
@@ -835,12 +1046,24 @@ def unload():
     # Restore mp_timelimit to its original (or changed) value
     cvar_mp_timelimit.set_float(mp_timelimit_old_value)
 
-    # Update database
-    save_maps_to_db()
+    # Wait for deferred saves, then update database right away
+    watchdog.shutdown()
+    save_maps_to_db.__wrapped__()
+
+    # Players will be able to rate the current map again, so its records
+    # must not be replayed on the next load
+    journal.discard_unapplied()
+    journal.stop()
+
+    # Stop all timers, including the ones for time restrictions and metrics
+    scheduler.cancel_all()
 
     # ... chat message
     broadcast(common_strings['unloaded'])
 
+    # Don't leave anything queued behind
+    message_dispatcher.flush()
+
 
 # =============================================================================
 # >> COMMANDS
@@ -858,6 +1081,7 @@ def cmd_mc_launch_vote(command):
 
 
 @SayCommand(ANTI_SPAM_TIMEOUT_PLAYER, ('!votemap', 'votemap'))
+@watchdog.entry_point('!votemap')
 def cmd_votemap(command, index, team_only):
     mcplayer = mcplayers[index]
     reason = mcplayer.get_vote_denial_reason()
@@ -869,6 +1093,7 @@ def cmd_votemap(command, index, team_only):
 
 
 @SayCommand(ANTI_SPAM_TIMEOUT_PLAYER, ('!nominate', 'nominate'))
+@watchdog.entry_point('!nominate')
 def cmd_nominate(command, index, team_only):
     mcplayer = mcplayers[index]
     reason = mcplayer.get_nominate_denial_reason()
@@ -881,11 +1106,13 @@ def cmd_nominate(command, index, team_only):
 
 @SayCommand(
     ANTI_SPAM_TIMEOUT_PLAYER, ('!rtv', 'rtv', 'rockthevote', '!rockthevote'))
+@watchdog.entry_point('!rockthevote')
 def cmd_rockthevote(command, index, team_only):
     mcplayers[index].rtv_callback()
 
 
 @SayCommand(ANTI_SPAM_TIMEOUT_PLAYER, '!likemap')
+@watchdog.entry_point('!likemap')
 def cmd_likemap(command, index, team_only):
     mcplayer = mcplayers[index]
     reason = mcplayer.get_likemap_denial_reason()
@@ -897,12 +1124,14 @@ def cmd_likemap(command, index, team_only):
 
 
 @SayCommand(ANTI_SPAM_TIMEOUT_PLAYER, ('!nextmap', 'nextmap'))
+@watchdog.entry_point('!nextmap')
 def cmd_nextmap(command, index, team_only):
     mcplayer = mcplayers[index]
     mcplayer.nextmap_callback()
 
 
 @SayCommand(ANTI_SPAM_TIMEOUT_PLAYER, ('!timeleft', 'timeleft'))
+@watchdog.entry_point('!timeleft')
 def cmd_timeleft(command, index, team_only):
     mcplayer = mcplayers[index]
     mcplayer.timeleft_callback()
@@ -912,6 +1141,7 @@ def cmd_timeleft(command, index, team_only):
 # >> EVENTS
 # =============================================================================
 @Event('round_end')
+@watchdog.entry_point('round_end')
 def on_round_end(game_event):
     if status.round_end_needed:
         logger.log_debug("round_end event, time to change the level")
@@ -920,6 +1150,7 @@ def on_round_end(game_event):
 
 
 @Event('cs_win_panel_match')
+@watchdog.entry_point('cs_win_panel_match')
 def on_cs_win_panel_match(game_event):
 
     # Check if the vote is still in progress
@@ -960,9 +1191,10 @@ def on_cs_win_panel_match(game_event):
 # >> LISTENERS
 # =============================================================================
 @OnLevelInit
+@watchdog.entry_point('OnLevelInit')
+@profiler.profile('listener_on_level_init')
 def listener_on_level_init(map_name):
-    logger.log_debug(
-        "Entered OnLevelInit listener (map_name={})...".format(map_name))
+    logger.log_debug("Entered OnLevelInit listener (map_name={})...", map_name)
 
     # Reset MCPlayer instances
     mcplayers.reset_all()
@@ -970,19 +1202,15 @@ def listener_on_level_init(map_name):
     # Clear SessionPlayerManager
     session_players.clear()
 
-    # Cancel delays if any
-    if delay_scheduled_vote is not None and delay_scheduled_vote.running:
-        delay_scheduled_vote.cancel()
+    # Cancel timers if any
+    for name in ('prepare_vote', 'scheduled_vote', 'change_level',
+                 'end_vote', 'likemap_survey'):
 
-    global delay_changelevel   # We will assign to this a few lines later
-    if delay_changelevel is not None and delay_changelevel.running:
-        delay_changelevel.cancel()
+        scheduler.cancel(name)
 
-    if delay_end_vote is not None and delay_end_vote.running:
-        delay_end_vote.cancel()
-
-    if delay_likemap_survey is not None and delay_likemap_survey.running:
-        delay_likemap_survey.cancel()
+    # Maps of the prepared vote might not even exist anymore
+    global prepared_vote
+    prepared_vote = None
 
     # Reset Status
     status.vote_status = VoteStatus.NOT_STARTED
@@ -990,8 +1218,15 @@ def listener_on_level_init(map_name):
     status.map_start_time = time()
     status.used_extends = 0
 
-    # Update database
-    GameThread(target=save_maps_to_db).start()
+    # Update database, then learn from the last level
+    learn = config_manager['recommendations_enable']
+    if learn and not recommender.available:
+        logger.log_warning(
+            "NumPy is not installed, mc_recommendations_enable is ignored")
+
+        learn = False
+
+    GameThread(target=update_database, args=(learn, )).start()
 
     # Reload maps
     reload_maps_from_mapcycle()
@@ -1000,8 +1235,9 @@ def listener_on_level_init(map_name):
     status.current_map = server_map_manager.get(map_name.lower())
 
     if status.current_map is None:
-        logger.log_debug("Current map '{}' is not "
-                         "from mapcycle.json!".format(map_name))
+        logger.log_debug(
+            "Current map '{}' is not "
+            "from mapcycle.json!", map_name)
 
     # Unsend popups
     main_popup.close()
@@ -1013,8 +1249,8 @@ def listener_on_level_init(map_name):
     server_map_manager.cap_recent_maps()
 
     logger.log_debug(
-        "Recent map names: {}".format(','.join(
-            server_map_manager.recent_map_names)))
+        "Recent map names: {}", ','.join(
+            server_map_manager.recent_map_names))
 
     # Schedule regular vote
     schedule_vote(was_extended=False)
@@ -1022,13 +1258,26 @@ def listener_on_level_init(map_name):
     # Schedule level changing - this can be later cancelled by map extensions
     schedule_change_level(was_extended=False)
 
+    # Pick up the new metrics interval, if it was changed
+    metrics.start()
+
+
+@OnTick
+def listener_on_tick():
+    scheduler.tick()
+
 
 @OnLevelShutdown
+@watchdog.entry_point('OnLevelShutdown')
 def listener_on_level_shutdown():
     logger.log_debug("Entered OnLevelShutdown listener")
 
     # Calculate map ratings
     if status.current_map is not None:
+        status.current_map.plays += 1
+        journal.append(JournalEntry.PLAYS, status.current_map.filename)
+
+        # Ratings themselves were journaled as soon as they were given
         for rating in session_players.get_map_ratings():
             if rating == 1:
                 status.current_map.likes += 1
@@ -1036,6 +1285,24 @@ def listener_on_level_shutdown():
             elif rating == -1:
                 status.current_map.dislikes += 1
 
+    journal.checkpoint()
+
+    # Remember who played the map and what they thought of it
+    if (status.current_map is not None and
+            config_manager['recommendations_enable']):
+
+        for session_player in session_players.values():
+            if session_player.steamid == 'BOT':
+                continue
+
+            recommender.record_play(
+                session_player.steamid, status.current_map.filename)
+
+            if session_player.rating != 0:
+                recommender.record_rating(
+                    session_player.steamid, status.current_map.filename,
+                    session_player.rating)
+
     session_players.reset_map_ratings()
 
 
@@ -0,0 +1,89 @@
+"""Benchmark how long it takes to import and load Map Cycle.
+
+Every run happens in a fresh interpreter, so that nothing is cached in
+sys.modules. Besides the timings, the report shows whether SQLAlchemy and
+Jinja2 were imported by that point.
+
+Usage:
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --runs 20 --maps 1000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import FakeServer, make_mapcycle
+
+
+HEAVY_MODULES = ('sqlalchemy', 'jinja2')
+
+
+def run_once(maps):
+    server = FakeServer(make_mapcycle(maps))
+    server.world.map_name = "de_map00000"
+
+    start = perf_counter()
+    import map_cycle.map_cycle as plugin
+    import_time = perf_counter() - start
+    imported_on_import = [
+        module for module in HEAVY_MODULES if module in sys.modules]
+
+    server.plugin = plugin
+    server._patch_time()
+
+    start = perf_counter()
+    plugin.load()
+    load_time = perf_counter() - start
+    imported_on_load = [
+        module for module in HEAVY_MODULES if module in sys.modules]
+
+    server.unload_plugin()
+    server.shutdown()
+
+    return {
+        'import': import_time * 1000,
+        'load': load_time * 1000,
+        'imported_on_import': imported_on_import,
+        'imported_on_load': imported_on_load,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--maps', type=int, default=100)
+    parser.add_argument('--json', action='store_true',
+                        help="run once and print JSON")
+    args = parser.parse_args()
+
+    if args.json:
+        print(json.dumps(run_once(args.maps)))
+        return
+
+    results = []
+    for i in range(args.runs):
+        output = subprocess.check_output((
+            sys.executable, os.path.abspath(__file__), '--json',
+            '--maps', str(args.maps)))
+
+        results.append(json.loads(output.decode().splitlines()[-1]))
+
+    for phase in ('import', 'load'):
+        timings = [result[phase] for result in results]
+        print("{:<7} median {:8.2f} ms, min {:8.2f} ms, max {:8.2f} ms".format(
+            phase, statistics.median(timings), min(timings), max(timings)))
+
+    print("Imported by the end of import: {}".format(
+        ', '.join(results[-1]['imported_on_import']) or "-"))
+    print("Imported by the end of load(): {}".format(
+        ', '.join(results[-1]['imported_on_load']) or "-"))
+
+
+if __name__ == "__main__":
+    main()
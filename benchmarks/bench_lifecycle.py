@@ -0,0 +1,170 @@
+"""Benchmark full map lifecycles on top of the Source.Python stand-ins.
+
+Every scenario (players x maps) runs in its own interpreter, because the
+plugin and the stand-ins keep their state in module globals.  A lifecycle
+consists of the following phases:
+
+    level_init  - OnLevelShutdown + OnLevelInit listeners
+    nominate    - a quarter of players nominate a map
+    rtv         - players type !rtv until the vote starts
+    vote        - most players pick a map in the vote popup
+    finish      - the vote times out and the next map is chosen
+    changelevel - round end, then the level changes to the next map
+
+Usage:
+    python benchmarks/bench_lifecycle.py
+    python benchmarks/bench_lifecycle.py --players 64 --maps 1000 --rounds 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import FakeServer, make_mapcycle
+
+
+PLAYER_COUNTS = (16, 64, 128)
+MAP_COUNTS = (100, 1000, 10000)
+PHASES = (
+    'load', 'level_init', 'nominate', 'rtv', 'vote', 'finish', 'changelevel',
+    'unload')
+
+NOMINATING_SHARE = 4
+VOTING_SHARE = 0.9
+
+
+class PhaseTimer:
+    def __init__(self):
+        self.timings = {phase: [] for phase in PHASES}
+
+    def __call__(self, phase):
+        return _Phase(self.timings[phase])
+
+
+class _Phase:
+    def __init__(self, timings):
+        self._timings = timings
+        self._start = None
+
+    def __enter__(self):
+        self._start = perf_counter()
+
+    def __exit__(self, *exc_info):
+        self._timings.append((perf_counter() - self._start) * 1000)
+
+
+def _pick(server, index, offset):
+    """Pick a selectable option from the open menu, starting at offset."""
+    menu, options = server.open_menu(index)
+    for i in range(len(options)):
+        option = options[(offset + i) % len(options)]
+        if option.selectable:
+            server.select(index, option)
+            return
+
+
+def run_lifecycle(server, plugin, timer, humans, map_name):
+    with timer('level_init'):
+        server.change_level(map_name)
+
+    server.advance(plugin.config_manager['rtv_delay'] + 1)
+
+    with timer('nominate'):
+        for i, index in enumerate(humans[::NOMINATING_SHARE]):
+            server.say(index, "!nominate")
+            if server.open_menu(index):
+                _pick(server, index, i * 3)
+
+    with timer('rtv'):
+        for index in humans:
+            server.say(index, "!rtv")
+            if server.open_menu(index):
+                break
+
+    with timer('vote'):
+        for i, index in enumerate(humans[:int(len(humans) * VOTING_SHARE)]):
+            if server.open_menu(index):
+                _pick(server, index, i % 5 + 1)
+
+    with timer('finish'):
+        server.advance(plugin.config_manager['vote_duration'] + 1)
+
+    next_map = plugin.status.next_map
+    if next_map is None or next_map.filename is None:
+        next_map_name = map_name
+    else:
+        next_map_name = next_map.filename
+
+    with timer('changelevel'):
+        server.fire_event('round_end')
+        server.clock.run_next_tick()
+
+    return next_map_name
+
+
+def run_scenario(players, maps, rounds):
+    server = FakeServer(make_mapcycle(maps))
+    timer = PhaseTimer()
+
+    map_name = "de_map00000"
+    with timer('load'):
+        plugin = server.load_plugin(map_name)
+        server.clock.run_next_tick()
+
+    humans = server.connect_players(players)
+
+    for i in range(rounds):
+        map_name = run_lifecycle(server, plugin, timer, humans, map_name)
+
+    with timer('unload'):
+        server.unload_plugin()
+
+    server.shutdown()
+
+    return {
+        phase: statistics.median(timings)
+        for phase, timings in timer.timings.items() if timings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--players', type=int, nargs='*',
+                        default=PLAYER_COUNTS)
+    parser.add_argument('--maps', type=int, nargs='*', default=MAP_COUNTS)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--json', action='store_true',
+                        help="run a single scenario and print JSON")
+    args = parser.parse_args()
+
+    if args.json:
+        print(json.dumps(
+            run_scenario(args.players[0], args.maps[0], args.rounds)))
+
+        return
+
+    print("Median per-phase timings in milliseconds, {} lifecycle(s) "
+          "per scenario".format(args.rounds))
+
+    print("{:>7} {:>6} ".format("players", "maps") + " ".join(
+        "{:>11}".format(phase) for phase in PHASES))
+
+    for maps in args.maps:
+        for players in args.players:
+            output = subprocess.check_output((
+                sys.executable, os.path.abspath(__file__), '--json',
+                '--players', str(players), '--maps', str(maps),
+                '--rounds', str(args.rounds)))
+
+            timings = json.loads(output.decode().splitlines()[-1])
+            print("{:>7} {:>6} ".format(players, maps) + " ".join(
+                "{:>11.2f}".format(timings.get(phase, float('nan')))
+                for phase in PHASES))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Run Map Cycle outside of a game server on top of the stand-in modules.
+
+The harness copies the plugin's configuration and data files into a
+temporary game directory, puts the stand-ins in front of ``sys.path`` and
+imports the plugin just like Source.Python would.  Everything time-related
+is driven by the deterministic clock from ``listeners.tick``.
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STANDINS_PATH = os.path.join(REPO_PATH, 'benchmarks', 'standins')
+PLUGINS_PATH = os.path.join(REPO_PATH, 'addons', 'source-python', 'plugins')
+TRANSLATIONS_PATH = os.path.join(
+    REPO_PATH, 'resource', 'source-python', 'translations')
+
+MAP_PREFIXES = ('de', 'cs', 'aim', 'surf', 'fy', 'awp', 'gg', 'ka')
+
+
+def make_mapcycle(map_count, time_restricted_share=0.05):
+    """Return a mapcycle.json-like list with `map_count` entries."""
+    mapcycle = []
+    for i in range(map_count):
+        prefix = MAP_PREFIXES[i % len(MAP_PREFIXES)]
+        entry = {'filename': "{}_map{:05d}".format(prefix, i)}
+        if i % 7 == 0:
+            entry['fullname'] = "Map #{}".format(i)
+
+        if time_restricted_share and i % int(1 / time_restricted_share) == 0:
+            entry['timerestrict'] = "{:02d}:00,{:02d}:30".format(
+                i % 24, (i + 8) % 24)
+
+        mapcycle.append(entry)
+
+    return mapcycle
+
+
+class FakeServer:
+    """A game server with one Map Cycle plugin loaded into it."""
+
+    def __init__(self, mapcycle, root=None):
+        self.root = root or tempfile.mkdtemp(prefix='mc-standin-')
+        self._prepare_root(mapcycle)
+
+        os.environ['MC_STANDIN_ROOT'] = self.root
+        os.environ['MC_STANDIN_TRANSLATIONS'] = TRANSLATIONS_PATH
+        for path in (PLUGINS_PATH, STANDINS_PATH):
+            if path not in sys.path:
+                sys.path.insert(0, path)
+
+        from _clients import clients
+        from _world import world
+        from listeners.tick import clock
+
+        self.clients = clients
+        self.world = world
+        self.clock = clock
+        self.plugin = None
+
+    def _prepare_root(self, mapcycle):
+        game_cfg = os.path.join(self.root, 'cfg')
+        shutil.copytree(
+            os.path.join(REPO_PATH, 'cfg'), game_cfg, dirs_exist_ok=True)
+
+        shutil.copytree(
+            os.path.join(REPO_PATH, 'addons', 'source-python', 'data'),
+            os.path.join(self.root, 'addons', 'source-python', 'data'),
+            dirs_exist_ok=True)
+
+        os.makedirs(os.path.join(self.root, 'maps'), exist_ok=True)
+        os.makedirs(
+            os.path.join(self.root, 'logs', 'source-python'), exist_ok=True)
+
+        with open(os.path.join(
+                game_cfg, 'source-python', 'map_cycle', 'mapcycle.json'),
+                'w') as f:
+
+            json.dump(mapcycle, f)
+
+    # Plugin lifecycle
+    def load_plugin(self, map_name=""):
+        self.world.map_name = map_name
+
+        import map_cycle.map_cycle as plugin
+
+        self.plugin = plugin
+        self._patch_time()
+        plugin.load()
+        return plugin
+
+    def unload_plugin(self):
+        self.plugin.unload()
+
+    def _patch_time(self):
+        for name, module in list(sys.modules.items()):
+            if not name.startswith('map_cycle'):
+                continue
+
+            if getattr(module, 'time', None) is not None and callable(
+                    module.time) and module.time.__module__ == 'time':
+
+                module.time = self.clock.time
+
+    def shutdown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    # Level lifecycle
+    def change_level(self, map_name):
+        from listeners import (
+            on_level_init_listener_manager, on_level_shutdown_listener_manager)
+
+        on_level_shutdown_listener_manager.notify()
+        self.world.map_name = map_name
+        on_level_init_listener_manager.notify(map_name)
+
+    def advance(self, seconds):
+        self.clock.advance(seconds)
+
+    def fire_event(self, event_name, **variables):
+        from events import fire
+
+        fire(event_name, **variables)
+
+    # Clients
+    def connect_players(self, count, bots=0, languages=('en', 'ru', 'es')):
+        indexes = []
+        for i in range(count):
+            indexes.append(self.clients.connect(
+                language=languages[i % len(languages)]))
+
+        for i in range(bots):
+            indexes.append(self.clients.connect(bot=True))
+
+        for index in indexes:
+            self.plugin.mcplayers[index]
+
+        return indexes
+
+    def disconnect_all(self):
+        self.clients.disconnect_all()
+
+    def say(self, index, text):
+        from spam_proof_commands import say_commands
+
+        say_commands[text](None, index, False)
+
+    def server_command(self, command_line):
+        from commands.typed import execute
+
+        return execute(command_line)
+
+    def open_menu(self, index):
+        from menus import open_menus
+
+        return open_menus.get(index)
+
+    def select(self, index, option):
+        from menus import select
+
+        select(index, option)
+
+    def close_menu(self, index):
+        from menus import close
+
+        close(index)
@@ -0,0 +1,49 @@
+"""Fake client slots (players and bots) connected to the fake server."""
+from _world import world
+
+
+class FakeClient:
+    def __init__(self, index, name, steamid, language):
+        self.index = index
+        self.name = name
+        self.steamid = steamid
+        self.language = language
+
+    @property
+    def is_bot(self):
+        return 'BOT' in self.steamid
+
+
+class ClientList(dict):
+    def __init__(self):
+        super().__init__()
+        self._next_index = 1
+
+    def connect(self, name=None, bot=False, language='en'):
+        index = self._next_index
+        self._next_index += 1
+        if bot:
+            steamid = "BOT"
+        else:
+            steamid = "STEAM_1:0:{}".format(index)
+
+        self[index] = FakeClient(
+            index, name or "Player{}".format(index), steamid, language)
+
+        return index
+
+    def disconnect(self, index):
+        from players.dictionary import notify_removed
+
+        notify_removed(index)
+        del self[index]
+
+    def disconnect_all(self):
+        for index in list(self):
+            self.disconnect(index)
+
+        self._next_index = 1
+
+
+clients = ClientList()
+world.clients = clients
@@ -0,0 +1,26 @@
+"""Shared state of the fake game server the stand-in modules talk to."""
+import os
+
+
+class World:
+    """Everything a benchmark or simulation may want to inspect or drive."""
+
+    def __init__(self):
+        self.root = os.environ.get('MC_STANDIN_ROOT', os.getcwd())
+        self.translations_root = os.environ.get('MC_STANDIN_TRANSLATIONS')
+        self.console = []
+        self.user_messages = []
+        self.popups_sent = []
+        self.sounds_played = []
+        self.game_ended = 0
+        self.map_name = ""
+        self.record_console = False
+
+    def reset_records(self):
+        del self.console[:]
+        del self.user_messages[:]
+        del self.popups_sent[:]
+        del self.sounds_played[:]
+
+
+world = World()
@@ -0,0 +1,18 @@
+class Color:
+    def __init__(self, r=255, g=255, b=255, a=255):
+        self.r, self.g, self.b, self.a = r, g, b, a
+
+    def __str__(self):
+        if self.a == 255:
+            return "\x07{:02X}{:02X}{:02X}".format(self.r, self.g, self.b)
+
+        return "\x08{:02X}{:02X}{:02X}{:02X}".format(
+            self.r, self.g, self.b, self.a)
+
+    def __eq__(self, other):
+        return (isinstance(other, Color) and
+                (self.r, self.g, self.b, self.a) ==
+                (other.r, other.g, other.b, other.a))
+
+    def __hash__(self):
+        return hash((self.r, self.g, self.b, self.a))
@@ -0,0 +1,52 @@
+import inspect
+
+_commands = {}
+
+
+class CommandInfo:
+    def __init__(self, command):
+        self.command = command
+
+
+class TypedServerCommand:
+    def __init__(self, commands, permission=None):
+        if isinstance(commands, str):
+            commands = [commands]
+
+        self.commands = tuple(commands)
+
+    def __call__(self, callback):
+        _commands[self.commands] = callback
+        return callback
+
+
+def execute(command_line):
+    """Run a typed server command given as a single console line."""
+    args = command_line.split()
+    for length in range(len(args), 0, -1):
+        callback = _commands.get(tuple(args[:length]))
+        if callback is not None:
+            break
+    else:
+        raise KeyError("Unknown command: {}".format(command_line))
+
+    values = args[length:]
+    converted = []
+    parameters = list(inspect.signature(callback).parameters.values())[1:]
+    for parameter in parameters:
+        if parameter.kind == parameter.VAR_POSITIONAL:
+            converter = parameter.annotation
+            converted.extend(converter(value) for value in values)
+            values = []
+            break
+
+        if not values:
+            break
+
+        converter = parameter.annotation
+        if converter is inspect.Parameter.empty:
+            converter = str
+
+        converted.append(converter(values.pop(0)))
+
+    return callback(CommandInfo(args), *converted)
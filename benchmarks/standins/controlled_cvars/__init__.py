@@ -0,0 +1,34 @@
+from cvars import ConVar
+
+
+class InvalidValue(Exception):
+    pass
+
+
+class ControlledConfigManager:
+    def __init__(self, filepath, cvar_prefix=''):
+        self.filepath = filepath
+        self.cvar_prefix = cvar_prefix
+        self._cvars = {}
+
+    def section(self, name):
+        pass
+
+    def controlled_cvar(self, handler, name, default, description="",
+                        min_value=None, max_value=None):
+        cvar = ConVar(self.cvar_prefix + name, str(default), description)
+        self._cvars[name] = (handler, cvar, default)
+        return cvar
+
+    def __getitem__(self, name):
+        handler, cvar, default = self._cvars[name]
+        try:
+            return handler(cvar)
+        except InvalidValue:
+            return handler(ConVar('_mc_default_' + name, str(default)))
+
+    def write(self):
+        pass
+
+    def execute(self):
+        pass
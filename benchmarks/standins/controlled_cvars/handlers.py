@@ -0,0 +1,37 @@
+from _world import world
+
+from . import InvalidValue
+
+
+class _Sound:
+    def __init__(self, sample):
+        self.sample = sample
+
+    def play(self, *indexes):
+        world.sounds_played.append(self.sample)
+
+
+def bool_handler(cvar):
+    return bool(int_handler(cvar))
+
+
+def int_handler(cvar):
+    try:
+        return int(cvar.get_string())
+    except ValueError:
+        raise InvalidValue
+
+
+def float_handler(cvar):
+    try:
+        return float(cvar.get_string())
+    except ValueError:
+        raise InvalidValue
+
+
+def sound_nullable_handler(cvar):
+    sample = cvar.get_string()
+    if not sample:
+        return None
+
+    return _Sound(sample)
@@ -0,0 +1,15 @@
+import os
+
+from _world import world
+
+GAME_NAME = os.environ.get('MC_STANDIN_GAME', 'csgo')
+
+
+def echo_console(text):
+    # The real one is a Boost.Python function that only takes str
+    if not isinstance(text, str):
+        raise TypeError(
+            "echo_console() expects str, got {}".format(type(text).__name__))
+
+    if world.record_console:
+        world.console.append(text)
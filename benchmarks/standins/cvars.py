@@ -0,0 +1,46 @@
+class ConVar:
+    _registry = {}
+
+    def __new__(cls, name, value="0", description="", flags=0, *args):
+        try:
+            return cls._registry[name]
+        except KeyError:
+            pass
+
+        cvar = super().__new__(cls)
+        cvar.name = name
+        cvar._value = str(value)
+        cvar.description = description
+        cls._registry[name] = cvar
+        return cvar
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def get_string(self):
+        return self._value
+
+    def get_int(self):
+        return int(float(self._value))
+
+    def get_float(self):
+        return float(self._value)
+
+    def get_bool(self):
+        return bool(self.get_int())
+
+    def set_string(self, value):
+        self._value = str(value)
+
+    def set_int(self, value):
+        self._value = str(int(value))
+
+    def set_float(self, value):
+        self._value = str(float(value))
+
+    def set_bool(self, value):
+        self._value = "1" if value else "0"
+
+
+ConVar('mapcyclefile', "mapcycle.txt")
+ConVar('mp_timelimit', "30")
@@ -0,0 +1,24 @@
+from _world import world
+
+
+class _EngineServer:
+    valid_maps = None
+
+    def is_map_valid(self, map_name):
+        if self.valid_maps is None:
+            return True
+
+        return map_name.lower() in self.valid_maps
+
+    def ChangeLevel(self, map_name, landmark=None):
+        pass
+
+
+class _GlobalVars:
+    @property
+    def map_name(self):
+        return world.map_name
+
+
+engine_server = _EngineServer()
+global_vars = _GlobalVars()
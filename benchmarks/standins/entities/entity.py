@@ -0,0 +1,13 @@
+from _world import world
+
+
+class Entity:
+    def __init__(self, classname):
+        self.classname = classname
+
+    @classmethod
+    def find_or_create(cls, classname):
+        return cls(classname)
+
+    def end_game(self):
+        world.game_ended += 1
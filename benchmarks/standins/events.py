@@ -0,0 +1,24 @@
+_handlers = {}
+
+
+class Event:
+    def __init__(self, *event_names):
+        self.event_names = event_names
+
+    def __call__(self, callback):
+        for event_name in self.event_names:
+            _handlers.setdefault(event_name, []).append(callback)
+
+        return callback
+
+
+class GameEvent(dict):
+    def __init__(self, name, **variables):
+        super().__init__(variables)
+        self.name = name
+
+
+def fire(event_name, **variables):
+    game_event = GameEvent(event_name, **variables)
+    for callback in list(_handlers.get(event_name, ())):
+        callback(game_event)
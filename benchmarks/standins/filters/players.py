@@ -0,0 +1,37 @@
+from _clients import clients
+from players.entity import Player
+
+
+class PlayerIter:
+    def __init__(self, is_filters=(), not_filters=()):
+        if isinstance(is_filters, str):
+            is_filters = (is_filters, )
+
+        if isinstance(not_filters, str):
+            not_filters = (not_filters, )
+
+        self.is_filters = is_filters
+        self.not_filters = not_filters
+
+    def _matches(self, client, filter_name):
+        if filter_name == 'all':
+            return True
+
+        if filter_name == 'bot':
+            return client.is_bot
+
+        if filter_name == 'human':
+            return not client.is_bot
+
+        raise ValueError("Unsupported filter: {}".format(filter_name))
+
+    def __iter__(self):
+        for index, client in list(clients.items()):
+            if not all(self._matches(client, name)
+                       for name in self.is_filters):
+                continue
+
+            if any(self._matches(client, name) for name in self.not_filters):
+                continue
+
+            yield Player(index)
@@ -0,0 +1,68 @@
+class _ListenerManager(list):
+    def notify(self, *args):
+        for callback in list(self):
+            callback(*args)
+
+
+class ListenerManager(_ListenerManager):
+    def register_listener(self, callback):
+        if callback in self:
+            raise ValueError("Callback already registered.")
+
+        self.append(callback)
+
+    def unregister_listener(self, callback):
+        if callback not in self:
+            raise ValueError("Callback not registered.")
+
+        self.remove(callback)
+
+
+class ListenerManagerDecorator:
+    manager = None
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.manager.register_listener(callback)
+
+    def __call__(self, *args, **kwargs):
+        return self.callback(*args, **kwargs)
+
+    def _unload_instance(self):
+        self.manager.unregister_listener(self.callback)
+
+
+class _ListenerDecorator:
+    manager = None
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.manager.append(callback)
+
+    def __call__(self, *args, **kwargs):
+        return self.callback(*args, **kwargs)
+
+    def _unload_instance(self):
+        self.manager.remove(self.callback)
+
+
+on_level_init_listener_manager = _ListenerManager()
+on_level_shutdown_listener_manager = _ListenerManager()
+on_tick_listener_manager = _ListenerManager()
+on_client_disconnect_listener_manager = _ListenerManager()
+
+
+class OnLevelInit(_ListenerDecorator):
+    manager = on_level_init_listener_manager
+
+
+class OnLevelShutdown(_ListenerDecorator):
+    manager = on_level_shutdown_listener_manager
+
+
+class OnTick(_ListenerDecorator):
+    manager = on_tick_listener_manager
+
+
+class OnClientDisconnect(_ListenerDecorator):
+    manager = on_client_disconnect_listener_manager
@@ -0,0 +1,106 @@
+"""Deterministic replacement for the tick-driven Delay machinery."""
+from heapq import heappop, heappush
+from itertools import count
+from threading import Thread
+
+from . import on_tick_listener_manager
+
+
+class Clock:
+    """Fake server clock; nothing happens until somebody advances it."""
+
+    tick_interval = 1 / 64
+
+    def __init__(self):
+        self.now = 1000000.0
+        self._delays = []
+        self._sequence = count()
+
+    def time(self):
+        return self.now
+
+    def schedule(self, delay):
+        heappush(self._delays, (delay.exec_time, next(self._sequence), delay))
+
+    def advance(self, seconds):
+        """Run every tick and Delay callback due in the next `seconds`."""
+        target = self.now + seconds
+        while True:
+            if on_tick_listener_manager:
+                next_time = self.now + self.tick_interval
+                if next_time > target:
+                    break
+
+                self.now = next_time
+                self._run_due_delays()
+                on_tick_listener_manager.notify()
+                continue
+
+            while self._delays and not self._delays[0][2].running:
+                heappop(self._delays)
+
+            if not self._delays or self._delays[0][0] > target:
+                break
+
+            self.now = max(self.now, self._delays[0][0])
+            self._run_due_delays()
+
+        self.now = target
+        self._run_due_delays()
+
+    def run_next_tick(self):
+        self.advance(self.tick_interval)
+
+    def pending_delays(self):
+        return sum(1 for entry in self._delays if entry[2].running)
+
+    def cancel_all(self):
+        for entry in self._delays:
+            entry[2].running = False
+
+        del self._delays[:]
+
+    def _run_due_delays(self):
+        while self._delays and self._delays[0][0] <= self.now:
+            delay = heappop(self._delays)[2]
+            if delay.running:
+                delay.running = False
+                delay.callback(*delay.args, **delay.kwargs)
+
+
+clock = Clock()
+
+
+class Delay:
+    def __init__(self, delay, callback, args=(), kwargs=None,
+                 cancel_on_level_end=False):
+        self.delay = delay
+        self.callback = callback
+        self.args = tuple(args)
+        self.kwargs = dict(kwargs) if kwargs else {}
+        self.cancel_on_level_end = cancel_on_level_end
+        self.exec_time = clock.now + max(delay, 0)
+        self.running = True
+        clock.schedule(self)
+
+    @property
+    def time_remaining(self):
+        return max(0.0, self.exec_time - clock.now) if self.running else 0
+
+    def cancel(self):
+        if not self.running:
+            raise ValueError("Delay is not running.")
+
+        self.running = False
+
+
+class GameThread(Thread):
+    """Runs its target inline unless MC_STANDIN_REAL_THREADS is set."""
+
+    real_threads = False
+
+    def start(self):
+        if self.real_threads:
+            return super().start()
+
+        self.run()
@@ -0,0 +1,41 @@
+from _world import world
+from core import echo_console
+
+
+class LogManager:
+    def __init__(self, name, level, areas, filepath=None, log_format=None,
+                 date_format=None):
+        self.name = name
+        self._level = level
+        self._areas = areas
+        self.records = []
+
+    @property
+    def level(self):
+        return self._level.get_int()
+
+    def _log(self, level, msg, *args):
+        message = msg % args if args else msg
+        self.records.append((level, message))
+
+        # Like the real LogManager, hand the message to the console as is
+        if self._areas.get_int() & 1:
+            echo_console(message)
+
+    def log_debug(self, msg, *args, **kwargs):
+        if self.level >= 4:
+            self._log(4, msg, *args)
+
+    def log_info(self, msg, *args, **kwargs):
+        if self.level >= 3:
+            self._log(3, msg, *args)
+
+    def log_warning(self, msg, *args, **kwargs):
+        if self.level >= 2:
+            self._log(2, msg, *args)
+
+    def log_exception(self, msg, *args, **kwargs):
+        self._log(1, msg, *args)
+
+    def log_message(self, msg, *args, **kwargs):
+        self._log(-1, msg, *args)
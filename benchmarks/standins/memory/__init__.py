@@ -0,0 +1,2 @@
+def get_virtual_function(obj, name):
+    return getattr(obj, name)
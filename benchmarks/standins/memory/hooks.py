@@ -0,0 +1,6 @@
+class PreHook:
+    def __init__(self, function):
+        self.function = function
+
+    def __call__(self, callback):
+        return callback
@@ -0,0 +1,129 @@
+"""Menus that render options per player and remember what is open."""
+from _clients import clients
+from _world import world
+from translations.strings import TranslationStrings
+
+# index -> (menu, rendered list of selectable options)
+open_menus = {}
+
+
+def _translate(text, index):
+    if isinstance(text, TranslationStrings):
+        return text.get_string(clients[index].language)
+
+    return str(text)
+
+
+class Text:
+    def __init__(self, text):
+        self.text = text
+
+
+class _BaseOption:
+    def __init__(self, text, value=None, highlight=True, selectable=True):
+        self.text = text
+        self.value = value
+        self.highlight = highlight
+        self.selectable = selectable
+
+
+class PagedOption(_BaseOption):
+    pass
+
+
+class SimpleOption(_BaseOption):
+    def __init__(self, choice_index, text, value=None, highlight=True,
+                 selectable=True):
+        super().__init__(text, value, highlight, selectable)
+        self.choice_index = choice_index
+
+
+class _BaseMenu(list):
+    page_size = None
+
+    def __init__(self, data=None, select_callback=None, build_callback=None,
+                 close_callback=None, title=None, **kwargs):
+        super().__init__(data or ())
+        self.select_callback = select_callback
+        self.build_callback = build_callback
+        self.close_callback = close_callback
+        self.title = title
+
+    def register_select_callback(self, callback):
+        self.select_callback = callback
+        return callback
+
+    def register_build_callback(self, callback):
+        self.build_callback = callback
+        return callback
+
+    def register_close_callback(self, callback):
+        self.close_callback = callback
+        return callback
+
+    def send(self, *ply_indexes):
+        if not ply_indexes:
+            ply_indexes = tuple(clients)
+
+        world.popups_sent.append((self, tuple(ply_indexes)))
+        for index in ply_indexes:
+            if index not in clients or clients[index].is_bot:
+                continue
+
+            if self.build_callback is not None:
+                self.build_callback(self, index)
+
+            if self.title is not None:
+                _translate(self.title, index)
+
+            # Only the first page is rendered, but options from every page
+            # can be picked
+            rendered = []
+            for option in self:
+                if (self.page_size is None or
+                        len(rendered) < self.page_size):
+
+                    _translate(option.text, index)
+
+                if isinstance(option, _BaseOption):
+                    rendered.append(option)
+
+            open_menus[index] = (self, rendered)
+
+    def close(self, *ply_indexes):
+        if not ply_indexes:
+            ply_indexes = tuple(open_menus)
+
+        for index in ply_indexes:
+            if index in open_menus and open_menus[index][0] is self:
+                del open_menus[index]
+
+    def is_active_menu(self, index):
+        return index in open_menus and open_menus[index][0] is self
+
+
+class PagedMenu(_BaseMenu):
+    page_size = 7
+
+
+class SimpleMenu(_BaseMenu):
+    pass
+
+
+def select(index, option):
+    """Make the client at `index` pick `option` from its open menu."""
+    menu, rendered = open_menus.pop(index)
+    if option not in rendered or not option.selectable:
+        raise ValueError("Option is not selectable")
+
+    if menu.select_callback is not None:
+        next_menu = menu.select_callback(menu, index, option)
+        if next_menu is not None:
+            next_menu.send(index)
+
+
+def close(index):
+    """Make the client at `index` close its open menu."""
+    menu, rendered = open_menus.pop(index)
+    if menu.close_callback is not None:
+        menu.close_callback(menu, index)
@@ -0,0 +1,57 @@
+"""User messages that render per language and record what was sent."""
+from _clients import clients
+from _world import world
+from translations.strings import TranslationStrings
+
+
+class UserMessageCreator(dict):
+    def __init__(self, **kwargs):
+        super().__init__(kwargs)
+
+    def __getattr__(self, attr):
+        try:
+            return self[attr]
+        except KeyError:
+            raise AttributeError(attr)
+
+    def __setattr__(self, attr, value):
+        self[attr] = value
+
+    def send(self, *player_indexes):
+        if not player_indexes:
+            player_indexes = tuple(clients)
+
+        by_language = {}
+        for index in player_indexes:
+            if index not in clients:
+                continue
+
+            by_language.setdefault(clients[index].language, []).append(index)
+
+        for language, indexes in by_language.items():
+            text = self['message']
+            if isinstance(text, TranslationStrings):
+                text = text.get_string(language)
+
+            world.user_messages.append(
+                (type(self).__name__, language, str(text), tuple(indexes)))
+
+
+class SayText2(UserMessageCreator):
+    def __init__(self, message="", index=0, chat=False):
+        super().__init__(message=message, index=index, chat=chat)
+
+
+class HintText(UserMessageCreator):
+    def __init__(self, message=""):
+        super().__init__(message=message)
+
+
+class HudMsg(UserMessageCreator):
+    def __init__(self, message="", x=-1, y=-1, color1=None, color2=None,
+                 effect=0, fade_in=0.0, fade_out=0.0, hold_time=4.0,
+                 fx_time=0.0, channel=0):
+        super().__init__(
+            message=message, x=x, y=y, color1=color1, color2=color2,
+            effect=effect, fade_in=fade_in, fade_out=fade_out,
+            hold_time=hold_time, fx_time=fx_time, channel=channel)
@@ -0,0 +1,74 @@
+"""Source.Python paths, rooted in MC_STANDIN_ROOT."""
+import os
+import shutil
+
+from _world import world
+
+
+class Path(str):
+    def __truediv__(self, other):
+        return Path(os.path.join(self, other))
+
+    @property
+    def parent(self):
+        return Path(os.path.dirname(self))
+
+    @property
+    def name(self):
+        return os.path.basename(self)
+
+    @property
+    def namebase(self):
+        return os.path.splitext(self.name)[0]
+
+    stem = namebase
+
+    @property
+    def ext(self):
+        return os.path.splitext(self)[1]
+
+    def isfile(self):
+        return os.path.isfile(self)
+
+    def isdir(self):
+        return os.path.isdir(self)
+
+    def exists(self):
+        return os.path.exists(self)
+
+    def makedirs_p(self):
+        os.makedirs(self, exist_ok=True)
+        return self
+
+    def remove_p(self):
+        try:
+            os.remove(self)
+        except FileNotFoundError:
+            pass
+
+        return self
+
+    def rmtree_p(self):
+        shutil.rmtree(self, ignore_errors=True)
+        return self
+
+    def files(self, pattern=None):
+        return [self / name for name in sorted(os.listdir(self))
+                if os.path.isfile(os.path.join(self, name))]
+
+    def dirs(self):
+        return [self / name for name in sorted(os.listdir(self))
+                if os.path.isdir(os.path.join(self, name))]
+
+    def getsize(self):
+        return os.path.getsize(self)
+
+
+GAME_PATH = Path(world.root)
+BASE_PATH = GAME_PATH / "addons" / "source-python"
+CFG_PATH = GAME_PATH / "cfg" / "source-python"
+LOG_PATH = GAME_PATH / "logs" / "source-python"
+PLUGIN_DATA_PATH = BASE_PATH / "data" / "plugins"
+TRANSLATION_PATH = Path(
+    world.translations_root or GAME_PATH / "resource" / "source-python" /
+    "translations")
@@ -0,0 +1,25 @@
+_dictionaries = []
+
+
+def notify_removed(index):
+    for dictionary in _dictionaries:
+        if index in dictionary:
+            dictionary.on_automatically_removed(index)
+            del dictionary[index]
+
+
+class PlayerDictionary(dict):
+    def __init__(self, factory=None, *args, **kwargs):
+        super().__init__()
+        self._factory = factory
+        self._args = args
+        self._kwargs = kwargs
+        _dictionaries.append(self)
+
+    def __missing__(self, index):
+        instance = self[index] = self._factory(index, *self._args,
+                                               **self._kwargs)
+        return instance
+
+    def on_automatically_removed(self, index):
+        pass
@@ -0,0 +1,26 @@
+from _clients import clients
+
+
+class Player:
+    def __init__(self, index):
+        try:
+            self._client = clients[index]
+        except KeyError:
+            raise ValueError("Invalid index {}".format(index))
+
+        self.index = index
+
+    @property
+    def name(self):
+        return self._client.name
+
+    @property
+    def steamid(self):
+        return self._client.steamid
+
+    @property
+    def language(self):
+        return self._client.language
+
+    def is_bot(self):
+        return self._client.is_bot
@@ -0,0 +1,8 @@
+from _clients import clients
+
+
+def get_client_language(index):
+    try:
+        return clients[index].language
+    except KeyError:
+        return ""
@@ -0,0 +1,13 @@
+class _PluginInfo:
+    def __init__(self, name):
+        self.name = name
+        self.verbose_name = name
+        self.version = "standin"
+
+
+class _PluginManager:
+    def get_plugin_info(self, module_name):
+        return _PluginInfo(module_name.split('.')[0])
+
+
+plugin_manager = _PluginManager()
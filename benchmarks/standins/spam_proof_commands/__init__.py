@@ -0,0 +1,2 @@
+say_commands = {}
+server_commands = {}
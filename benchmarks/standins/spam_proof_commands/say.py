@@ -0,0 +1,15 @@
+from . import say_commands
+
+
+class SayCommand:
+    def __init__(self, timeout, names):
+        if isinstance(names, str):
+            names = (names, )
+
+        self.names = names
+
+    def __call__(self, callback):
+        for name in self.names:
+            say_commands[name] = callback
+
+        return callback
@@ -0,0 +1,2 @@
+class Downloadables(set):
+    pass
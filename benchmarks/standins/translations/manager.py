@@ -0,0 +1,15 @@
+class _LanguageManager(dict):
+    default = 'en'
+    fallback = 'en'
+
+    def __init__(self):
+        super().__init__(english='en', russian='ru', spanish='es')
+
+    def get_language(self, language):
+        if language in self.values():
+            return language
+
+        return self.get(language)
+
+
+language_manager = _LanguageManager()
@@ -0,0 +1,64 @@
+import re
+
+from _world import world
+from paths import TRANSLATION_PATH
+from translations.manager import language_manager
+
+_SECTION_RE = re.compile(r'^\[(?P<name>.+)\]\s*$')
+_VALUE_RE = re.compile(r'^(?P<key>[\w-]+)\s*=\s*"(?P<value>.*)"\s*$')
+
+
+class TranslationStrings(dict):
+    def __init__(self):
+        super().__init__()
+        self.tokens = {}
+
+    def get_string(self, language=None, **tokens):
+        language = language_manager.get_language(language)
+        if language not in self:
+            language = language_manager.default
+            if language not in self:
+                language = language_manager.fallback
+                if language not in self:
+                    raise KeyError(language)
+
+        language_tokens = dict(self.tokens)
+        language_tokens.update(tokens)
+        for token, value in language_tokens.items():
+            if isinstance(value, TranslationStrings):
+                language_tokens[token] = value.get_string(language, **tokens)
+
+        return self[language].format(**language_tokens)
+
+    def tokenized(self, **tokens):
+        new_translation_strings = TranslationStrings()
+        new_translation_strings.tokens.update(self.tokens)
+        new_translation_strings.tokens.update(tokens)
+        new_translation_strings.update(self)
+        return new_translation_strings
+
+
+def _unescape(value):
+    return value.replace('\\n', '\n').replace('\\t', '\t')
+
+
+class LangStrings(dict):
+    def __init__(self, infile, encoding='utf_8'):
+        super().__init__()
+        self._path = TRANSLATION_PATH / (infile + ".ini")
+        section = None
+        with open(self._path, encoding=encoding) as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith(('#', ';')):
+                    continue
+
+                match = _SECTION_RE.match(line)
+                if match:
+                    section = self[match.group('name')] = TranslationStrings()
+                    continue
+
+                match = _VALUE_RE.match(line)
+                if match and section is not None:
+                    section[match.group('key')] = _unescape(
+                        match.group('value'))
@@ -0,0 +1,173 @@
+"""Regression tests that run the plugin on top of the stand-ins.
+
+Like the benchmarks, every scenario runs in its own interpreter, because
+the plugin and the stand-ins keep their state in module globals.
+
+Usage:
+    python -m pytest benchmarks
+"""
+import os
+import subprocess
+import sys
+from textwrap import dedent
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+
+PRELUDE = """
+import sys
+sys.path.insert(0, {path!r})
+
+from harness import FakeServer, make_mapcycle
+"""
+
+
+def run_scenario(script):
+    """Run the script after the harness is imported, return its stdout."""
+    process = subprocess.run(
+        (sys.executable, '-c', PRELUDE.format(path=BENCHMARKS_PATH) +
+         dedent(script)),
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+
+    assert process.returncode == 0, process.stderr
+    return process.stdout
+
+
+def test_log_messages_reach_console_as_str():
+    output = run_scenario("""
+        server = FakeServer(make_mapcycle(20))
+
+        from cvars import ConVar
+        ConVar('mc_logging_level').set_string('4')
+        ConVar('mc_logging_areas').set_string('5')
+
+        plugin = server.load_plugin('de_map00000')
+        server.change_level('cs_map00001')
+        server.advance(1)
+
+        print(any(message.startswith("Added ")
+                  for level, message in plugin.logger.records))
+
+        plugin.unload()
+        server.shutdown()
+    """)
+
+    assert output.split() == ['True']
+
+
+def test_string_tags_are_rejected():
+    output = run_scenario("""
+        mapcycle = make_mapcycle(20)
+        mapcycle[1]['tags'] = "de"
+        mapcycle[2]['tags'] = ["de", "night"]
+
+        server = FakeServer(mapcycle)
+        plugin = server.load_plugin('de_map00000')
+
+        print(mapcycle[1]['filename'] in plugin.server_map_manager)
+        print(sorted(plugin.server_map_manager[
+            mapcycle[2]['filename']].tags))
+
+        plugin.unload()
+        server.shutdown()
+    """)
+
+    assert output.split() == ['False', "['de',", "'night']"]
+
+
+def test_votes_reuse_the_sampler():
+    output = run_scenario("""
+        server = FakeServer(make_mapcycle(40))
+
+        from cvars import ConVar
+        ConVar('mc_weighted_sampling_enable').set_string('1')
+
+        plugin = server.load_plugin('de_map00000')
+        server.change_level('cs_map00001')
+        server.connect_players(4)
+        server.advance(1)
+
+        manager = plugin.server_map_manager
+        plugin.build_vote_options(False)
+        sampler = manager._sampler
+        server.advance(60)
+        plugin.build_vote_options(False)
+        print(sampler is not None and manager._sampler is sampler)
+
+        # Past the cutoff of a map that is new now, it must be rebuilt
+        ConVar('mc_new_map_timeout_days').set_string('0')
+        server_map = manager['aim_map00002']
+        server_map.in_database = True
+        server_map.detected = int(server.clock.time()) - 86400 + 30
+        manager.refresh_new_map_cutoff()
+        sampler = manager._sampler
+        server.advance(60)
+        plugin.build_vote_options(False)
+        print(manager._sampler is not sampler)
+
+        plugin.unload()
+        server.shutdown()
+    """)
+
+    assert output.split() == ['True', 'True']
+
+
+def test_unload_discards_ratings_of_the_current_level():
+    output = run_scenario("""
+        import os
+
+        server = FakeServer(make_mapcycle(20))
+        plugin = server.load_plugin('de_map00000')
+
+        from map_cycle.core.journal import RECORD
+        from map_cycle.core.paths import JOURNAL_PATH
+
+        def count_records():
+            return os.path.getsize(JOURNAL_PATH) // RECORD.size
+
+        # Ratings of a level that has ended stay until they're saved
+        server.change_level('cs_map00001')
+        indexes = server.connect_players(2)
+        plugin.mcplayers[indexes[0]].likemap_callback(1)
+        server.advance(2)
+        print(count_records())
+
+        server.change_level('aim_map00002')
+        server.disconnect_all()
+        indexes = server.connect_players(2)
+        plugin.mcplayers[indexes[0]].likemap_callback(1)
+        plugin.mcplayers[indexes[1]].likemap_callback(-1)
+        server.advance(2)
+        print(count_records())
+
+        plugin.unload()
+        print(count_records())
+        print(plugin.server_map_manager['cs_map00001'].likes,
+              plugin.server_map_manager['aim_map00002'].likes)
+
+        server.shutdown()
+    """)
+
+    assert output.split() == ['1', '2', '0', '1', '0']
+
+
+def test_database_dump_sorts_by_new_columns():
+    output = run_scenario("""
+        server = FakeServer(make_mapcycle(20))
+        plugin = server.load_plugin('de_map00000')
+        server.change_level('cs_map00001')
+        server.world.record_console = True
+
+        for order_by in ('-plays', 'wilson_score'):
+            server.server_command('mc db dump_html ' + order_by)
+
+        server.advance(1)
+        print(sum(line.startswith("Dump written to")
+                  for line in server.world.console))
+
+        plugin.unload()
+        server.shutdown()
+    """)
+
+    assert output.split() == ['2']